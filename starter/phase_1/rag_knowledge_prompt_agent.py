@@ -65,6 +65,6 @@ print("="*60)
 print("This agent demonstrates Retrieval-Augmented Generation (RAG) by:")
 print("1. Chunking the provided knowledge text into manageable pieces")
 print("2. Creating embeddings for each chunk using text-embedding-3-large")
-print("3. Finding the most relevant chunk based on semantic similarity to the prompt")
-print("4. Using only that retrieved chunk to generate the response")
+print("3. Finding the most relevant chunks based on semantic similarity to the prompt")
+print("4. Using only the retrieved chunks (up to a token budget) to generate the response")
 print("5. This ensures the response is grounded in the provided knowledge")
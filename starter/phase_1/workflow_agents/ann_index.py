@@ -0,0 +1,237 @@
+"""
+Approximate Nearest Neighbor Index
+
+This module provides an IVF (inverted file) index implemented in pure NumPy for RAG
+corpora that are too large for brute-force search. Chunk embeddings are clustered
+with spherical k-means into `nlist` coarse cells; a query is compared with the cell
+centroids first and only the vectors of the `nprobe` closest cells are scored.
+Raising `nprobe` trades speed for recall.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import os
+
+import numpy as np
+
+from .vector_store import _top_k, normalize_vector
+
+
+class IVFIndex:
+    """
+    An inverted-file approximate nearest neighbor index over a VectorStore, using
+    cosine similarity. Vectors of each cell are stored contiguously, so probing a
+    cell is a single slice of the matrix. The cell-ordered matrix is saved with the
+    index and memory-mapped when the index is reopened.
+
+    Use Case: Millisecond retrieval for the RAGKnowledgePromptAgent on corpora with
+    hundreds of thousands to millions of chunks.
+    """
+
+    def __init__(self, store, centroids, order, offsets, nprobe=8, normalized=None, matrix=None):
+        """
+        Initialize the IVFIndex from a trained layout. Use build() to train a new index
+        or load() to reopen a saved one.
+
+        Args:
+            store (VectorStore): The embeddings and chunk metadata to index
+            centroids (np.ndarray): Unit-length cell centroids, shape (nlist, dim)
+            order (np.ndarray): Chunk rows sorted by cell
+            offsets (np.ndarray): Start of each cell in `order`, plus the total count
+            nprobe (int): Number of cells scanned per query (recall/speed knob)
+            normalized (np.ndarray, optional): The store's embeddings already normalized
+                (as computed by build()), so they are not normalized a second time
+            matrix (np.ndarray, optional): The cell-ordered normalized vectors saved with
+                the index (possibly memory-mapped); computed from the store if not given
+        """
+        self.store = store
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+        # Cell-contiguous copy of the normalized vectors: row i holds chunk order[i]
+        if matrix is None:
+            matrix = _cell_matrix(store.embeddings if normalized is None else normalized, order,
+                                  normalize=normalized is None)
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, store, nlist=None, nprobe=8, train_size=None, iterations=20, seed=0):
+        """
+        Train the coarse quantizer with spherical k-means and build the inverted lists.
+
+        Args:
+            store (VectorStore): The embeddings and chunk metadata to index
+            nlist (int, optional): Number of cells; defaults to about 4 * sqrt(number of chunks)
+            nprobe (int): Number of cells scanned per query (recall/speed knob)
+            train_size (int, optional): Vectors sampled for k-means; defaults to 64 per cell
+            iterations (int): Number of k-means iterations
+            seed (int): Random seed for sampling and initialization
+
+        Returns:
+            IVFIndex: The trained index; an empty store gives an empty index with no cells
+        """
+        if len(store) == 0:
+            dim = store.embeddings.shape[1]
+            return cls(store, np.empty((0, dim), dtype=np.float32), np.empty(0, dtype=np.int64),
+                       np.zeros(1, dtype=np.int64), nprobe=nprobe)
+        normalized = _normalize_rows(store.embeddings)
+        count = len(normalized)
+        nlist = max(1, min(nlist or int(4 * np.sqrt(count)), count))
+        centroids = _train_centroids(normalized, nlist, train_size or 64 * nlist, iterations, seed)
+        assignments = _assign(normalized, centroids)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        return cls(store, centroids, order, offsets, nprobe=nprobe, normalized=normalized)
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def nlist(self):
+        """
+        int: Number of coarse cells.
+        """
+        return len(self.centroids)
+
+    def search(self, query_embedding, k=5, nprobe=None):
+        """
+        Find (approximately) the k chunks most similar to a query embedding.
+
+        Args:
+            query_embedding (array-like): The query vector
+            k (int): Number of results to return
+            nprobe (int, optional): Cells to scan for this query; defaults to self.nprobe
+
+        Returns:
+            list: Up to k chunk metadata dictionaries, each with an added 'score'
+            (cosine similarity), most similar first
+        """
+        if self.nlist == 0:
+            return []
+        query = normalize_vector(query_embedding)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        cells = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        spans = [(self.offsets[cell], self.offsets[cell + 1]) for cell in cells]
+        scores = np.concatenate([self.matrix[start:end] @ query for start, end in spans])
+        ids = np.concatenate([self.order[start:end] for start, end in spans])
+        return _top_k(self.store.chunks, scores, k, ids=ids)
+
+    def save(self, path):
+        """
+        Write the trained index layout to `<path>.ivf.npz` and the cell-ordered,
+        normalized vectors to `<path>.ivf.npy`.
+
+        Args:
+            path (str): Path prefix of the index files
+        """
+        np.save(f"{path}.ivf.npy", self.matrix)
+        np.savez(
+            f"{path}.ivf.npz",
+            centroids=self.centroids, order=self.order, offsets=self.offsets, nprobe=self.nprobe
+        )
+
+    @classmethod
+    def load(cls, store, path, mmap=True):
+        """
+        Open an index saved by save() for the given store.
+
+        Args:
+            store (VectorStore): The store the index was built from
+            path (str): Path prefix of the index files
+            mmap (bool): Memory-map the cell-ordered vectors instead of reading them into memory
+
+        Returns:
+            IVFIndex: The reopened index
+        """
+        with np.load(f"{path}.ivf.npz") as data:
+            centroids, order, offsets = data["centroids"], data["order"], data["offsets"]
+            nprobe = int(data["nprobe"])
+        if len(order) != len(store):
+            raise ValueError(f"Index at {path} covers {len(order)} chunks, store has {len(store)}")
+        matrix = None
+        if os.path.exists(f"{path}.ivf.npy"):
+            matrix = np.load(f"{path}.ivf.npy", mmap_mode="r" if mmap else None)
+        return cls(store, centroids, order, offsets, nprobe=nprobe, matrix=matrix)
+
+    @staticmethod
+    def exists(path):
+        """
+        Return True if an index file exists for the given path prefix.
+        """
+        return os.path.exists(f"{path}.ivf.npz")
+
+    @staticmethod
+    def remove(path):
+        """
+        Delete the index files saved for the given path prefix, if any.
+        """
+        for suffix in (".ivf.npz", ".ivf.npy"):
+            if os.path.exists(f"{path}{suffix}"):
+                os.remove(f"{path}{suffix}")
+
+
+def _normalize_rows(matrix, block_size=65536):
+    """
+    Return a float32 copy of a matrix with unit-length rows, processed in blocks so a
+    memory-mapped matrix is never materialized in float64.
+    """
+    normalized = np.empty(matrix.shape, dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        normalized[start:start + block_size] = block / np.where(norms == 0, 1, norms)
+    return normalized
+
+
+def _cell_matrix(matrix, order, normalize=True, block_size=65536):
+    """
+    Return a float32 copy of the rows of a matrix in the given order, written block by
+    block into one preallocated array (and normalized on the way unless the rows are
+    already unit length), so no full-size temporary copy is made.
+    """
+    ordered = np.empty((len(order), matrix.shape[1]), dtype=np.float32)
+    for start in range(0, len(order), block_size):
+        block = np.asarray(matrix[order[start:start + block_size]], dtype=np.float32)
+        if normalize:
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            block /= np.where(norms == 0, 1, norms)
+        ordered[start:start + block_size] = block
+    return ordered
+
+
+def _assign(vectors, centroids, block_size=65536):
+    """
+    Return the index of the most similar centroid for every vector.
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        assignments[start:start + block_size] = np.argmax(vectors[start:start + block_size] @ centroids.T, axis=1)
+    return assignments
+
+
+def _train_centroids(vectors, nlist, train_size, iterations, seed):
+    """
+    Train unit-length centroids with spherical k-means on a random sample of vectors.
+    """
+    if len(vectors) == 0:
+        raise ValueError("Cannot train IVF centroids without any vectors")
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(train_size, len(vectors)), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+        # Re-seed empty cells with random sample points so every cell stays useful
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize_rows(sums)
+    return centroids
@@ -1,11 +1,27 @@
-from openai import OpenAI
 import numpy as np
 import pandas as pd
-import re
 import csv
+import hashlib
+import os
 import uuid
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from .ann_index import IVFIndex
+from .chunking import iter_chunks
+from .convergence import ConvergenceDetector
+from .embedding_ingestion import EmbeddingIngestor
+from .list_items import NUMBERED_ITEM, join_items, replace_item, split_items
+from .llm_client import get_shared_client
+from .plans import build_plan_instructions, parse_plan
+from .response_cache import ResponseCache
+from .tokens import count_tokens
+from .validators import build_fix_instructions, run_validators
+from .vector_store import FlatIndex, VectorStore, normalize_vector
+from .verdicts import ACCEPTANCE_RULES, build_json_verdict_prompt, combine_verdicts, parse_verdict
+
 
 class DirectPromptAgent:
     """
@@ -16,34 +32,50 @@ class DirectPromptAgent:
     Use Case: Simple question-answering scenarios where no additional context is needed.
     """
     
-    def __init__(self, openai_api_key):
+    def __init__(self, openai_api_key, client=None):
         """
         Initialize the DirectPromptAgent.
         
         Args:
             openai_api_key (str): OpenAI API key for authentication
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
         """
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
 
-    def respond(self, prompt):
+    def respond(self, prompt, temperature=0):
         """
         Generate a response using direct LLM interaction without system prompts.
         
         Args:
             prompt (str): User input prompt to send to the LLM
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
             
         Returns:
             str: The LLM's response content as plain text
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}  # Direct user message, no system prompt
-            ],
-            temperature=0
-        )
-        return response.choices[0].message.content
+        return self.client.chat(messages=self._build_messages(prompt), temperature=temperature)
+
+    async def arespond(self, prompt, temperature=0):
+        """
+        Asynchronous counterpart of respond().
+        
+        Args:
+            prompt (str): User input prompt to send to the LLM
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
+            
+        Returns:
+            str: The LLM's response content as plain text
+        """
+        return await self.client.achat(messages=self._build_messages(prompt), temperature=temperature)
+
+    def _build_messages(self, prompt):
+        """
+        Build the chat messages for a prompt.
+        """
+        return [
+            {"role": "user", "content": prompt}  # Direct user message, no system prompt
+        ]
         
 class AugmentedPromptAgent:
     """
@@ -54,40 +86,54 @@ class AugmentedPromptAgent:
     Use Case: When you need responses that follow a specific tone, style, or expertise level.
     """
     
-    def __init__(self, openai_api_key, persona):
+    def __init__(self, openai_api_key, persona, client=None):
         """
         Initialize the AugmentedPromptAgent with API key and persona.
         
         Args:
             openai_api_key (str): OpenAI API key for authentication
             persona (str): The persona/role the agent should adopt (e.g., "college professor")
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
         """
         self.persona = persona
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
 
-    def respond(self, input_text):
+    def respond(self, input_text, temperature=0):
         """
         Generate a response using the specified persona via system prompts.
         
         Args:
             input_text (str): User input prompt
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
             
         Returns:
             str: LLM response following the specified persona
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
+        return self.client.chat(messages=self._build_messages(input_text), temperature=temperature)
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                # System prompt sets persona and resets context
-                {"role": "system", "content": f"You are {self.persona}. Forget all previous context."},
-                {"role": "user", "content": input_text}
-            ],
-            temperature=0
-        )
+    async def arespond(self, input_text, temperature=0):
+        """
+        Asynchronous counterpart of respond().
+        
+        Args:
+            input_text (str): User input prompt
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
+            
+        Returns:
+            str: LLM response following the specified persona
+        """
+        return await self.client.achat(messages=self._build_messages(input_text), temperature=temperature)
 
-        return response.choices[0].message.content
+    def _build_messages(self, input_text):
+        """
+        Build the persona-driven chat messages for a prompt.
+        """
+        return [
+            # System prompt sets persona and resets context
+            {"role": "system", "content": f"You are {self.persona}. Forget all previous context."},
+            {"role": "user", "content": input_text}
+        ]
 
 class KnowledgeAugmentedPromptAgent:
     """
@@ -99,7 +145,7 @@ class KnowledgeAugmentedPromptAgent:
     you want to override the LLM's training data with custom information.
     """
     
-    def __init__(self, openai_api_key, persona, knowledge):
+    def __init__(self, openai_api_key, persona, knowledge, client=None):
         """
         Initialize the KnowledgeAugmentedPromptAgent.
         
@@ -107,62 +153,133 @@ class KnowledgeAugmentedPromptAgent:
             openai_api_key (str): OpenAI API key for authentication
             persona (str): The persona/role the agent should adopt
             knowledge (str): Specific knowledge the agent should use exclusively
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
         """
         self.persona = persona
         self.knowledge = knowledge
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
 
-    def respond(self, input_text):
+    def respond(self, input_text, temperature=0):
         """
         Generate a response using only the provided knowledge and persona.
         
         Args:
             input_text (str): User input prompt
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
             
         Returns:
             str: LLM response based solely on provided knowledge
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
+        return self.client.chat(messages=self._build_messages(input_text), temperature=temperature)
+
+    async def arespond(self, input_text, temperature=0):
+        """
+        Asynchronous counterpart of respond().
         
+        Args:
+            input_text (str): User input prompt
+            temperature (float): Sampling temperature; 0 gives deterministic, cacheable answers
+            
+        Returns:
+            str: LLM response based solely on provided knowledge
+        """
+        return await self.client.achat(messages=self._build_messages(input_text), temperature=temperature)
+
+    def _build_messages(self, input_text):
+        """
+        Build the chat messages constraining the LLM to the provided knowledge.
+        """
         # Construct system message with persona and knowledge constraints
         system_message = (
             f"You are {self.persona} knowledge-based assistant. Forget all previous context. "
             f"Use only the following knowledge to answer, do not use your own knowledge: {self.knowledge} "
             f"Answer the prompt based on this knowledge, not your own."
         )
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": input_text}
-            ],
-            temperature=0
-        )
-        return response.choices[0].message.content
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": input_text}
+        ]
 
 # RAGKnowledgePromptAgent class definition
 class RAGKnowledgePromptAgent:
     """
     An agent that uses Retrieval-Augmented Generation (RAG) to find knowledge from a large corpus
     and leverages embeddings to respond to prompts based solely on retrieved information.
+
+    Chunk embeddings are kept in a binary VectorStore that is loaded once per agent and
+    memory-mapped when reopened from disk. Queries are served by a resident index, either
+    exact ("flat") or approximate ("ivf") for large corpora, and answered from the top-k
+    retrieved chunks, packed up to a token budget.
     """
 
-    def __init__(self, openai_api_key, persona, chunk_size=2000, chunk_overlap=100):
+    INDEX_TYPES = ("flat", "ivf")
+
+    def __init__(self, openai_api_key, persona, chunk_size=500, chunk_overlap=25, client=None,
+                 embedding_batch_tokens=50000, embedding_concurrency=4, top_k=5, context_token_budget=2000,
+                 index_type="flat", index_params=None, store_path=None):
         """
         Initializes the RAGKnowledgePromptAgent with API credentials and configuration settings.
 
         Parameters:
         openai_api_key (str): API key for accessing OpenAI.
         persona (str): Persona description for the agent.
-        chunk_size (int): The size of text chunks for embedding. Defaults to 2000.
-        chunk_overlap (int): Overlap between consecutive chunks. Defaults to 100.
+        chunk_size (int): The maximum size of text chunks for embedding, in tokens. Defaults to 500.
+        chunk_overlap (int): Maximum overlap between consecutive chunks, in tokens. Defaults to 25.
+        client (LLMClient): Shared LLM client. Defaults to the process-wide client.
+        embedding_batch_tokens (int): Token bound of each batched embeddings request. Defaults to 50000.
+        embedding_concurrency (int): Maximum embeddings requests in flight during ingestion. Defaults to 4.
+        top_k (int): Number of chunks retrieved per query. Defaults to 5.
+        context_token_budget (int): Maximum tokens of retrieved text packed into the answer prompt. Defaults to 2000.
+        index_type (str): "flat" for exact search or "ivf" for approximate search. Defaults to "flat".
+        index_params (dict): Options for the IVF index, e.g. {"nlist": 1024, "nprobe": 16}.
+        store_path (str): Path prefix of the vector store, chunks CSV and ingestion progress files.
+            Defaults to a new prefix per agent; pass the prefix of a store built earlier to reopen it
+            (and its saved IVF index) from disk, or of an interrupted ingestion to resume it.
         """
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {self.INDEX_TYPES}, got {index_type!r}")
         self.persona = persona
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.top_k = top_k
+        self.context_token_budget = context_token_budget
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
+        self.ingestor = EmbeddingIngestor(
+            self.client, max_batch_tokens=embedding_batch_tokens, concurrency=embedding_concurrency
+        )
         self.unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.csv"
+        self.store_path = store_path
+        self._vector_store = None
+        self._index = None
+
+    @property
+    def embeddings_path(self):
+        """
+        str: Path prefix of the binary vector store files (<prefix>.npy and <prefix>.jsonl).
+        """
+        if self.store_path is not None:
+            return self.store_path
+        return f"embeddings-{os.path.splitext(self.unique_filename)[0]}"
+
+    @property
+    def chunks_path(self):
+        """
+        str: Path of the chunks CSV file, next to the vector store when store_path is given.
+        """
+        if self.store_path is not None:
+            return f"{self.store_path}.chunks.csv"
+        return f"chunks-{self.unique_filename}"
+
+    @property
+    def progress_dir(self):
+        """
+        str: Directory holding the embedded batches of an unfinished ingestion.
+        """
+        return f"{self.embeddings_path}.parts"
 
     def get_embedding(self, text):
         """
@@ -174,13 +291,19 @@ class RAGKnowledgePromptAgent:
         Returns:
         list: The embedding vector.
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text,
-            encoding_format="float"
-        )
-        return response.data[0].embedding
+        return self.client.embed(text)
+
+    async def aget_embedding(self, text):
+        """
+        Asynchronous counterpart of get_embedding().
+
+        Parameters:
+        text (str): Text to embed.
+
+        Returns:
+        list: The embedding vector.
+        """
+        return await self.client.aembed(text)
 
     def calculate_similarity(self, vector_one, vector_two):
         """
@@ -198,58 +321,138 @@ class RAGKnowledgePromptAgent:
 
     def chunk_text(self, text):
         """
-        Splits text into manageable chunks, attempting natural breaks.
+        Splits text into token-sized chunks at paragraph and sentence boundaries and
+        writes them to the chunks CSV file as they are produced.
 
         Parameters:
-        text (str): Text to split into chunks.
+        text (str, file or iterable): The text, an open text file, or an iterator of text pieces.
 
         Returns:
         list: List of dictionaries containing chunk metadata.
         """
-        separator = "\n"
-        text = re.sub(r'\s+', ' ', text).strip()
+        chunks = []
+        fieldnames = ["text", "chunk_size", "token_count", "start_char", "end_char"]
+        with open(self.chunks_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for chunk in iter_chunks(text, self.chunk_size, self.chunk_overlap):
+                writer.writerow({k: chunk[k] for k in fieldnames})
+                chunks.append(chunk)
 
-        if len(text) <= self.chunk_size:
-            return [{"chunk_id": 0, "text": text, "chunk_size": len(text)}]
+        return chunks
 
-        chunks, start, chunk_id = [], 0, 0
+    def chunk_file(self, path):
+        """
+        Chunks a text file by streaming it, without reading the whole file into memory first.
 
-        while start < len(text):
-            end = min(start + self.chunk_size, len(text))
-            if separator in text[start:end]:
-                end = start + text[start:end].rindex(separator) + len(separator)
+        Parameters:
+        path (str): Path of the text file.
 
-            chunks.append({
-                "chunk_id": chunk_id,
-                "text": text[start:end],
-                "chunk_size": end - start,
-                "start_char": start,
-                "end_char": end
-            })
+        Returns:
+        list: List of dictionaries containing chunk metadata.
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            return self.chunk_text(file)
 
-            start = end - self.chunk_overlap
-            chunk_id += 1
+    def calculate_embeddings(self):
+        """
+        Calculates embeddings for each chunk and stores them in a binary vector store:
+        a float32 .npy matrix plus a .jsonl chunk metadata sidecar.
 
-        with open(f"chunks-{self.unique_filename}", 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=["text", "chunk_size"])
-            writer.writeheader()
-            for chunk in chunks:
-                writer.writerow({k: chunk[k] for k in ["text", "chunk_size"]})
+        Chunks are embedded in token-bounded batches that run concurrently. Finished
+        batches are saved under <embeddings_path>.parts, so re-running after an
+        interruption only embeds the remaining batches. To resume in a new process,
+        create the agent with the same store_path; progress left by different chunks
+        is discarded.
 
-        return chunks
+        Returns:
+        DataFrame: DataFrame containing text chunks and their embeddings.
+        """
+        df = pd.read_csv(self.chunks_path, encoding='utf-8')
+        embeddings = self.ingestor.ingest(df['text'].tolist(), progress_dir=self.progress_dir)
+        return self._store_embeddings(df, embeddings)
 
-    def calculate_embeddings(self):
+    async def acalculate_embeddings(self):
         """
-        Calculates embeddings for each chunk and stores them in a CSV file.
+        Asynchronous counterpart of calculate_embeddings().
 
         Returns:
         DataFrame: DataFrame containing text chunks and their embeddings.
         """
-        df = pd.read_csv(f"chunks-{self.unique_filename}", encoding='utf-8')
-        df['embeddings'] = df['text'].apply(self.get_embedding)
-        df.to_csv(f"embeddings-{self.unique_filename}", encoding='utf-8', index=False)
+        df = pd.read_csv(self.chunks_path, encoding='utf-8')
+        embeddings = await self.ingestor.aingest(df['text'].tolist(), progress_dir=self.progress_dir)
+        return self._store_embeddings(df, embeddings)
+
+    def _store_embeddings(self, df, embeddings):
+        """
+        Save the chunk embeddings as the agent's vector store and attach them to the DataFrame.
+        """
+        chunks = [{"chunk_id": chunk_id, **chunk} for chunk_id, chunk in enumerate(df.to_dict("records"))]
+        df['embeddings'] = list(embeddings)
+        self._vector_store = VectorStore(embeddings, chunks)
+        self._vector_store.save(self.embeddings_path)
+        self._index = None
+        IVFIndex.remove(self.embeddings_path)  # built for the previous embeddings
         return df
 
+    def load_vector_store(self):
+        """
+        Returns the agent's vector store, opening (memory-mapping) it from disk on first use.
+        A store built by an earlier process is reopened by passing its store_path to the agent.
+
+        Returns:
+        VectorStore: The chunk embeddings and their metadata.
+        """
+        if self._vector_store is None:
+            self._vector_store = VectorStore.load(self.embeddings_path)
+        return self._vector_store
+
+    def load_index(self):
+        """
+        Returns the agent's resident search index, building it from the vector store on first use.
+        An IVF index is trained once and saved next to the vector store; later opens reuse it.
+
+        Returns:
+        FlatIndex or IVFIndex: Index over the chunk embeddings.
+        """
+        if self._index is None:
+            store = self.load_vector_store()
+            if self.index_type == "flat":
+                self._index = FlatIndex(store)
+            elif IVFIndex.exists(self.embeddings_path):
+                self._index = IVFIndex.load(store, self.embeddings_path)
+                self._index.nprobe = self.index_params.get("nprobe", self._index.nprobe)
+            else:
+                self._index = IVFIndex.build(store, **self.index_params)
+                self._index.save(self.embeddings_path)
+        return self._index
+
+    def search(self, query, k=None):
+        """
+        Finds the chunks most similar to a query: one embedding call plus one matrix-vector product.
+
+        Parameters:
+        query (str): Text to search for.
+        k (int): Number of chunks to return. Defaults to the agent's top_k.
+
+        Returns:
+        list: Chunk metadata dictionaries with a 'score', most similar first.
+        """
+        return self.load_index().search(self.get_embedding(query), k or self.top_k)
+
+    async def asearch(self, query, k=None):
+        """
+        Asynchronous counterpart of search().
+
+        Parameters:
+        query (str): Text to search for.
+        k (int): Number of chunks to return. Defaults to the agent's top_k.
+
+        Returns:
+        list: Chunk metadata dictionaries with a 'score', most similar first.
+        """
+        return self.load_index().search(await self.aget_embedding(query), k or self.top_k)
+
     def find_prompt_in_knowledge(self, prompt):
         """
         Finds and responds to a prompt based on similarity with embedded knowledge.
@@ -258,26 +461,46 @@ class RAGKnowledgePromptAgent:
         prompt (str): User input prompt.
 
         Returns:
-        str: Response derived from the most similar chunk in knowledge.
+        str: Response derived from the most similar chunks in knowledge.
         """
-        prompt_embedding = self.get_embedding(prompt)
-        df = pd.read_csv(f"embeddings-{self.unique_filename}", encoding='utf-8')
-        df['embeddings'] = df['embeddings'].apply(lambda x: np.array(eval(x)))
-        df['similarity'] = df['embeddings'].apply(lambda emb: self.calculate_similarity(prompt_embedding, emb))
+        context = self._pack_context(self.search(prompt))
+        return self.client.chat(messages=self._build_messages(context, prompt), temperature=0)
 
-        best_chunk = df.loc[df['similarity'].idxmax(), 'text']
+    async def afind_prompt_in_knowledge(self, prompt):
+        """
+        Asynchronous counterpart of find_prompt_in_knowledge().
 
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": f"You are {self.persona}, a knowledge-based assistant. Forget previous context."},
-                {"role": "user", "content": f"Answer based only on this information: {best_chunk}. Prompt: {prompt}"}
-            ],
-            temperature=0
-        )
+        Parameters:
+        prompt (str): User input prompt.
+
+        Returns:
+        str: Response derived from the most similar chunks in knowledge.
+        """
+        context = self._pack_context(await self.asearch(prompt))
+        return await self.client.achat(messages=self._build_messages(context, prompt), temperature=0)
 
-        return response.choices[0].message.content
+    def _pack_context(self, results):
+        """
+        Join retrieved chunks, most similar first, while they fit in the context token
+        budget. The most similar chunk is always included.
+        """
+        texts, used_tokens = [], 0
+        for result in results:
+            tokens = count_tokens(result["text"])
+            if texts and used_tokens + tokens > self.context_token_budget:
+                break
+            texts.append(result["text"])
+            used_tokens += tokens
+        return "\n\n".join(texts)
+
+    def _build_messages(self, context, prompt):
+        """
+        Build the chat messages answering a prompt from retrieved context.
+        """
+        return [
+            {"role": "system", "content": f"You are {self.persona}, a knowledge-based assistant. Forget previous context."},
+            {"role": "user", "content": f"Answer based only on this information: {context}. Prompt: {prompt}"}
+        ]
 
 class EvaluationAgent:
     """
@@ -289,7 +512,13 @@ class EvaluationAgent:
     standards or formats before being considered acceptable.
     """
     
-    def __init__(self, openai_api_key, persona, evaluation_criteria, worker_agent, max_interactions):
+    VERDICT_FORMATS = ("text", "json")
+    COMPACT_FEEDBACK_TOKENS = 200
+
+    def __init__(self, openai_api_key, persona, evaluation_criteria, worker_agent, max_interactions, client=None,
+                 verdict_format="text", validators=None, candidates=1, candidate_temperature=0.7,
+                 token_budget=None, convergence_threshold=0.98, rubric=None, acceptance="all", min_score=None,
+                 incremental=False, item_pattern=NUMBERED_ITEM, verdict_cache=None):
         """
         Initialize the EvaluationAgent.
         
@@ -299,14 +528,82 @@ class EvaluationAgent:
             evaluation_criteria (str): Specific criteria to evaluate responses against
             worker_agent: The agent whose responses will be evaluated
             max_interactions (int): Maximum number of evaluation-correction cycles
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
+            verdict_format (str): "text" for a Yes/No verdict followed by a separate call for
+                correction instructions, or "json" for one call returning a structured verdict
+                with pass/fail, per-criterion scores and the correction instructions
+            validators (list, optional): Local checks run before the judge (see validators.py);
+                a response failing any of them is rejected without calling the judge
+            candidates (int): Number of worker responses generated and judged concurrently in
+                the first interaction; the best passing one is returned, and the correction loop
+                continues from the best failing one only if none pass
+            candidate_temperature (float): Sampling temperature for the extra candidates (the
+                first candidate always uses temperature 0)
+            token_budget (int, optional): Maximum tokens (worker and judge prompts plus replies)
+                spent per evaluation, including the worker call behind a response passed in as
+                initial_response. Correction prompts are compacted when the next interaction
+                would exceed it, and the loop stops when even a compacted one would
+            convergence_threshold (float, optional): Similarity (0 to 1) from which a rejected
+                response and its evaluation count as unchanged from the previous interaction; the
+                loop stops early when refinement stalls or the worker repeats an earlier response.
+                None disables the check
+            rubric (list, optional): Independent criteria, as strings or {'name', 'criterion'}
+                dictionaries (see verdicts.split_rubric). Each criterion is judged by its own
+                structured-verdict call, all concurrently, instead of one call for the whole
+                evaluation_criteria. In incremental mode, criteria with scope "response" are
+                judged against the whole response rather than against single items
+            acceptance (str or callable): How rubric verdicts combine: "all", "any" or "majority"
+                of the criteria must pass, or a callable taking {name: verdict}
+            min_score (float, optional): With a rubric, also require this mean criterion score
+            incremental (bool): Split list-shaped responses into items, judge each item, and send
+                only the failing items back to the worker for correction, splicing the corrected
+                items (exactly one item each, keeping the original list marker) into the response.
+                Validators and rubric criteria with scope "response" are checked on the whole
+                response first and again before a corrected response is accepted (it is refined
+                as a whole if they fail); the other criteria apply to single items, so a rubric
+                with at least one item-scoped criterion is required. Responses with fewer than
+                two items are evaluated as a whole
+            item_pattern (str): Regular expression matching the start of each item (see list_items.py)
+            verdict_cache (ResponseCache, optional): Cache of judge verdicts keyed by persona,
+                criteria and response hash (per criterion with a rubric); a hit skips the judge call.
+                Give the cache a path to keep verdicts across runs
         """
+        if verdict_format not in self.VERDICT_FORMATS:
+            raise ValueError(f"verdict_format must be one of {self.VERDICT_FORMATS}, got {verdict_format!r}")
+        if candidates < 1:
+            raise ValueError(f"candidates must be at least 1, got {candidates}")
+        if candidates > 1 and "temperature" not in inspect.signature(worker_agent.respond).parameters:
+            raise ValueError("Best-of-N evaluation needs a worker whose respond() accepts a temperature")
+        if incremental and candidates > 1:
+            raise ValueError("Incremental evaluation does not support best-of-N candidates")
+        if incremental and not any(isinstance(item, str) or item.get("scope") != "response" for item in rubric or []):
+            # The full evaluation_criteria describe the whole response, which a single item can never meet
+            raise ValueError("Incremental evaluation needs a rubric with item-scoped criteria (see verdicts.split_rubric)")
+        if not callable(acceptance) and acceptance not in ACCEPTANCE_RULES:
+            raise ValueError(f"acceptance must be one of {ACCEPTANCE_RULES} or a callable, got {acceptance!r}")
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
         self.persona = persona
         self.evaluation_criteria = evaluation_criteria
         self.worker_agent = worker_agent
         self.max_interactions = max_interactions
+        self.verdict_format = verdict_format
+        self.validators = list(validators or [])
+        self.candidates = candidates
+        self.candidate_temperature = candidate_temperature
+        self.token_budget = token_budget
+        self.convergence_threshold = convergence_threshold
+        self.rubric = [
+            item if isinstance(item, dict) else {"name": f"criterion {number}", "criterion": item}
+            for number, item in enumerate(rubric or [], start=1)
+        ]
+        self.acceptance = acceptance
+        self.min_score = min_score
+        self.incremental = incremental
+        self.item_pattern = item_pattern
+        self.verdict_cache = verdict_cache
 
-    def evaluate(self, initial_prompt):
+    def evaluate(self, initial_prompt, initial_response=None):
         """
         Manage iterative evaluation and improvement of worker agent responses.
         
@@ -318,61 +615,152 @@ class EvaluationAgent:
         
         Args:
             initial_prompt (str): The original prompt to evaluate
+            initial_response (str, optional): A response to the prompt the caller already
+                obtained from the worker; it is judged first instead of asking the worker again
+            
+        Returns:
+            dict: Contains 'final_response', 'evaluation', 'verdict', 'iterations', 'stop_reason'
+            ('accepted', 'max_interactions', 'token_budget', 'repeated_response' or 'stalled')
+            and 'tokens' (token usage); incremental evaluations also return the 'items'
+        """
+        return self._run_sync(self._evaluation_loop(initial_prompt, initial_response))
+
+    async def aevaluate(self, initial_prompt, initial_response=None):
+        """
+        Asynchronous counterpart of evaluate(). Worker and judge calls are awaited on the
+        running event loop, so many evaluations can proceed concurrently.
+        
+        Args:
+            initial_prompt (str): The original prompt to evaluate
+            initial_response (str, optional): A response to the prompt the caller already
+                obtained from the worker; it is judged first instead of asking the worker again
             
         Returns:
-            dict: Contains 'final_response', 'evaluation', and 'iterations'
+            dict: Contains 'final_response', 'evaluation', 'verdict', 'iterations', 'stop_reason'
+            and 'tokens'
+        """
+        return await self._run_async(self._evaluation_loop(initial_prompt, initial_response))
+
+    def evaluate_response(self, initial_prompt, response):
+        """
+        Judge (and if needed refine) a response the caller already has. Equivalent to
+        evaluate(initial_prompt, initial_response=response).
+        
+        Args:
+            initial_prompt (str): The prompt the response answers
+            response (str): The worker response to evaluate
+            
+        Returns:
+            dict: Contains 'final_response', 'evaluation', 'verdict', 'iterations', 'stop_reason'
+            and 'tokens'
+        """
+        return self.evaluate(initial_prompt, initial_response=response)
+
+    async def aevaluate_response(self, initial_prompt, response):
+        """
+        Asynchronous counterpart of evaluate_response().
+        
+        Args:
+            initial_prompt (str): The prompt the response answers
+            response (str): The worker response to evaluate
+            
+        Returns:
+            dict: Contains 'final_response', 'evaluation', 'verdict', 'iterations', 'stop_reason'
+            and 'tokens'
+        """
+        return await self.aevaluate(initial_prompt, initial_response=response)
+
+    def _evaluation_loop(self, initial_prompt, initial_response=None):
+        """
+        The evaluation feedback loop shared by evaluate() and aevaluate().
+        
+        This generator performs no I/O itself. It yields the list of LLM calls it needs,
+        each ("worker", prompt), ("candidate", prompt) or ("judge", messages), is sent back
+        the list of results in the same order, and finally returns the result dictionary.
+        Calls yielded together are independent and may run concurrently.
+        """
+        usage = {"total": 0, "per_iteration": [], "budget": self.token_budget}
+        if initial_response is not None:
+            # The caller's worker call that produced the seeded response counts toward the
+            # budget; it is reported with the first interaction
+            seeded_tokens = self._call_tokens(("worker", initial_prompt)) + count_tokens(initial_response)
+            usage["total"] = usage["unassigned"] = seeded_tokens
+        loop = self._item_refinement_loop if self.incremental else self._refinement_loop
+        result = yield from self._metered(loop(initial_prompt, initial_response, usage), usage)
+        result["tokens"] = usage
+        return result
+
+    def _refinement_loop(self, initial_prompt, initial_response, usage):
+        """
+        Generate, judge and correct until a response is accepted or a limit is reached.
+        Token usage is accounted into `usage` by _metered() as calls complete.
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
         prompt_to_evaluate = initial_prompt
+        convergence = ConvergenceDetector(self.convergence_threshold) if self.convergence_threshold is not None else None
 
         for i in range(self.max_interactions):
             print(f"\n--- Interaction {i+1} ---")
+            usage["per_iteration"].append(usage.pop("unassigned", 0))
 
             print(" Step 1: Worker agent generates a response to the prompt")
             print(f"Prompt:\n{prompt_to_evaluate}")
-            response_from_worker = self.worker_agent.respond(prompt_to_evaluate)  # TODO: 3 - Obtain a response from the worker agent
-            print(f"Worker Agent Response:\n{response_from_worker}")
+            responses = [initial_response] if i == 0 and initial_response is not None else []  # Seeded by the caller
+            count = self.candidates if i == 0 else 1
+            if len(responses) < count:
+                calls = [("worker", prompt_to_evaluate)] + [("candidate", prompt_to_evaluate)] * (count - 1)
+                calls = calls[len(responses):count]
+                generated = yield calls  # TODO: 3 - Obtain a response from the worker agent
+                responses += generated
+            for number, response in enumerate(responses, start=1):
+                label = f" (candidate {number}/{count})" if count > 1 else ""
+                print(f"Worker Agent Response{label}:\n{response}")
 
             print(" Step 2: Evaluator agent judges the response")
-            eval_prompt = (
-                f"Does the following answer: {response_from_worker}\n"
-                f"Meet this criteria: {self.evaluation_criteria} "  # TODO: 4 - Insert evaluation criteria here
-                f"Respond Yes or No, and the reason why it does or doesn't meet the criteria."
-            )
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[  # TODO: 5 - Define the message structure sent to the LLM for evaluation (use temperature=0)
-                    {"role": "system", "content": self.persona},
-                    {"role": "user", "content": eval_prompt}
-                ],
-                temperature=0
-            )
-            evaluation = response.choices[0].message.content.strip()
+            tokens_before_judging = usage["total"]
+            verdicts = yield from self._gather([self._judge(response) for response in responses])
+            best = self._select_candidate(verdicts)
+            if count > 1:
+                print(f"Selected candidate {best + 1}/{count}")
+            response_from_worker, verdict = responses[best], verdicts[best]
+            evaluation = verdict["evaluation"]
             print(f"Evaluator Agent Evaluation:\n{evaluation}")
+            if verdict["scores"]:
+                print(f"Scores: {verdict['scores']}")
 
             print(" Step 3: Check if evaluation is positive")
-            if evaluation.lower().startswith("yes"):
+            if verdict["passed"]:
                 print("Final solution accepted.")
+                self._report_tokens(i, usage)
                 return {
                     "final_response": response_from_worker,
                     "evaluation": evaluation,
-                    "iterations": i + 1
+                    "verdict": verdict,
+                    "iterations": i + 1,
+                    "stop_reason": "accepted"
                 }
             else:
+                stall = convergence.check(response_from_worker, evaluation) if convergence else None
+                if stall is not None:
+                    reason, description = stall
+                    print(f"[EVALUATION STOPPED] Refinement has converged: {description}.")
+                    self._report_tokens(i, usage)
+                    return {
+                        "final_response": response_from_worker,
+                        "evaluation": evaluation,
+                        "verdict": verdict,
+                        "iterations": i + 1,
+                        "stop_reason": reason
+                    }
+
                 print(" Step 4: Generate instructions to correct the response")
-                instruction_prompt = (
-                    f"Provide instructions to fix an answer based on these reasons why it is incorrect: {evaluation}"
-                )
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[  # TODO: 6 - Define the message structure sent to the LLM to generate correction instructions (use temperature=0)
-                        {"role": "system", "content": self.persona},
-                        {"role": "user", "content": instruction_prompt}
-                    ],
-                    temperature=0
-                )
-                instructions = response.choices[0].message.content.strip()
+                instructions = verdict["instructions"]
+                if not instructions:
+                    instructions, = yield [("judge", self._instruction_messages(evaluation))]  # TODO: 6 - Define the message structure sent to the LLM to generate correction instructions (use temperature=0)
+                    instructions = instructions.strip()
                 print(f"Instructions to fix:\n{instructions}")
+                self._report_tokens(i, usage)
+                if i + 1 == self.max_interactions:
+                    break
 
                 print(" Step 5: Send feedback to worker agent for refinement")
                 prompt_to_evaluate = (
@@ -381,15 +769,456 @@ class EvaluationAgent:
                     f"It has been evaluated as incorrect.\n"
                     f"Make only these corrections, do not alter content validity: {instructions}"
                 )
+                if self.token_budget is not None:
+                    # Estimate the next interaction: the worker call (with the worker's own system
+                    # prompt, even when this interaction made no worker call because the response
+                    # was passed in), a response of the current size, and judging as in this one
+                    remaining = self.token_budget - usage["total"]
+                    judging_tokens = (usage["total"] - tokens_before_judging) / count
+                    base_tokens = judging_tokens + count_tokens(response_from_worker)
+                    if base_tokens + self._call_tokens(("worker", prompt_to_evaluate)) > remaining:
+                        compact_prompt = self._compact_correction_prompt(initial_prompt, response_from_worker, instructions)
+                        if base_tokens + self._call_tokens(("worker", compact_prompt)) > remaining:
+                            print(f"[TOKEN BUDGET] Stopping: the next interaction would exceed the budget of {self.token_budget} tokens")
+                            return {
+                                "final_response": response_from_worker,
+                                "evaluation": evaluation,
+                                "verdict": verdict,
+                                "iterations": i + 1,
+                                "stop_reason": "token_budget"
+                            }
+                        print(f"[TOKEN BUDGET] Compacted the correction prompt ({remaining} tokens left)")
+                        prompt_to_evaluate = compact_prompt
         
         # If max interactions reached without success
         return {
             # TODO: 7 - Return a dictionary containing the final response, evaluation, and number of iterations
             "final_response": response_from_worker,
             "evaluation": evaluation,
-            "iterations": self.max_interactions
+            "verdict": verdict,
+            "iterations": self.max_interactions,
+            "stop_reason": "max_interactions"
         }
 
+    def _item_refinement_loop(self, initial_prompt, initial_response, usage):
+        """
+        Incremental variant of _refinement_loop(): judge the items of a list-shaped
+        response individually and correct only the failing ones. Accepted items are never
+        judged or regenerated again.
+        """
+        response = initial_response
+        if response is None:
+            print(" Step 1: Worker agent generates a response to the prompt")
+            response, = yield [("worker", initial_prompt)]
+        header, items = split_items(response, self.item_pattern)
+        if len(items) < 2:
+            print("[INCREMENTAL] Fewer than two items found, evaluating the whole response")
+            return (yield from self._refinement_loop(initial_prompt, response, usage))
+
+        # Item judges cannot see how many items there are or how they relate, so whole-response
+        # requirements (item counts, diversity) are checked before the items are split apart
+        print(" Step 2: Evaluator agent checks the response as a whole")
+        overall = yield from self._judge(response, scope="overall")
+        if not overall["passed"]:
+            print(f"[INCREMENTAL] The response as a whole fails its checks, refining it as a whole:\n{overall['evaluation']}")
+            return (yield from self._refinement_loop(initial_prompt, response, usage))
+
+        verdicts = [None] * len(items)
+        detectors = [
+            ConvergenceDetector(self.convergence_threshold) if self.convergence_threshold is not None else None
+            for _ in items
+        ]
+        pending = list(range(len(items)))  # items whose current text has not been judged yet
+        stalled = set()
+        corrected_any = False
+        stop_reason = "max_interactions"
+
+        for i in range(self.max_interactions):
+            print(f"\n--- Interaction {i+1} ---")
+            usage["per_iteration"].append(usage.pop("unassigned", 0))
+
+            print(f" Step 2: Evaluator agent judges {len(pending)} of {len(items)} items")
+            results = yield from self._gather([self._judge(items[index], scope="item") for index in pending])
+            for index, verdict in zip(pending, results):
+                verdicts[index] = verdict
+            failing = [index for index, verdict in enumerate(verdicts) if not verdict["passed"]]
+            print(f"Items accepted: {len(items) - len(failing)}/{len(items)}")
+
+            print(" Step 3: Check if all items are accepted")
+            if not failing:
+                if corrected_any:
+                    # Corrections may have broken whole-response requirements, so check them again
+                    response = join_items(header, items)
+                    overall = yield from self._judge(response, scope="overall")
+                    if not overall["passed"]:
+                        print(f"[INCREMENTAL] The corrected response as a whole fails its checks, refining it as a whole:\n{overall['evaluation']}")
+                        self._report_tokens(i, usage)
+                        return (yield from self._refinement_loop(initial_prompt, response, usage))
+                print("Final solution accepted.")
+                self._report_tokens(i, usage)
+                return self._item_result(header, items, verdicts, i + 1, "accepted")
+
+            for index in failing:
+                if detectors[index] is not None and index not in stalled and index in pending:
+                    if detectors[index].check(items[index], verdicts[index]["evaluation"]) is not None:
+                        stalled.add(index)
+            correctable = [index for index in failing if index not in stalled]
+            if not correctable:
+                print("[EVALUATION STOPPED] Refinement has converged: every failing item has stalled.")
+                stop_reason = "stalled"
+                break
+            if i + 1 == self.max_interactions:
+                break
+            if self.token_budget is not None and usage["total"] >= self.token_budget:
+                print(f"[TOKEN BUDGET] Stopping: the budget of {self.token_budget} tokens is spent")
+                stop_reason = "token_budget"
+                break
+
+            print(f" Step 4: Generate instructions to correct {len(correctable)} items")
+            missing = [index for index in correctable if not verdicts[index]["instructions"]]
+            if missing:
+                replies = yield [("judge", self._instruction_messages(verdicts[index]["evaluation"])) for index in missing]
+                for index, reply in zip(missing, replies):
+                    verdicts[index]["instructions"] = reply.strip()
+
+            print(" Step 5: Send the failing items to the worker agent for refinement")
+            corrected = yield [
+                ("worker", (
+                    f"The original prompt was: {initial_prompt}\n"
+                    f"One item of the response to that prompt was: {items[index].strip()}\n"
+                    f"It has been evaluated as incorrect.\n"
+                    f"Make only these corrections, do not alter content validity, and return only the "
+                    f"corrected item in the same format: {verdicts[index]['instructions']}"
+                ))
+                for index in correctable
+            ]
+            pending = []
+            for index, text in zip(correctable, corrected):
+                try:
+                    items[index] = replace_item(items[index], text, self.item_pattern)
+                except ValueError as error:
+                    print(f"[INCREMENTAL] Kept item {index + 1} unchanged, its correction is unusable: {error}")
+                    continue
+                print(f"Corrected item {index + 1}:\n{items[index]}")
+                pending.append(index)
+                corrected_any = True
+            self._report_tokens(i, usage)
+
+        self._report_tokens(i, usage)
+        return self._item_result(header, items, verdicts, i + 1, stop_reason)
+
+    @staticmethod
+    def _item_result(header, items, verdicts, iterations, stop_reason):
+        """
+        Build the result dictionary of an incremental evaluation.
+        """
+        evaluation = "\n".join(
+            f"Item {number}: {'PASS' if verdict['passed'] else 'FAIL'} - {verdict['evaluation']}"
+            for number, verdict in enumerate(verdicts, start=1)
+        )
+        passed = all(verdict["passed"] for verdict in verdicts)
+        return {
+            "final_response": join_items(header, items),
+            "evaluation": evaluation,
+            "verdict": {
+                "passed": passed,
+                "evaluation": evaluation,
+                "scores": {},
+                "instructions": "\n".join(
+                    f"Item {number}: {verdict['instructions']}"
+                    for number, verdict in enumerate(verdicts, start=1) if not verdict["passed"]
+                )
+            },
+            "iterations": iterations,
+            "stop_reason": stop_reason,
+            "items": [
+                {"text": item, "passed": verdict["passed"], "evaluation": verdict["evaluation"]}
+                for item, verdict in zip(items, verdicts)
+            ]
+        }
+
+    def _metered(self, steps, usage):
+        """
+        Sub-generator that forwards the calls of `steps` and adds the tokens of each
+        call and its result to the usage totals of the current interaction.
+        """
+        results = None
+        while True:
+            try:
+                calls = steps.send(results)
+            except StopIteration as stop:
+                return stop.value
+            results = yield calls
+            tokens = sum(self._call_tokens(call) + count_tokens(result) for call, result in zip(calls, results))
+            usage["total"] += tokens
+            if usage["per_iteration"]:
+                usage["per_iteration"][-1] += tokens
+            else:
+                # Calls made before the first interaction are reported with it
+                usage["unassigned"] = usage.get("unassigned", 0) + tokens
+
+    def _call_tokens(self, call):
+        """
+        Count the prompt tokens of a call. Worker prompts include the worker's own system
+        prompt (persona and knowledge) when the worker exposes how it builds its messages.
+        """
+        kind, payload = call
+        if kind == "judge":
+            messages = payload
+        elif hasattr(self.worker_agent, "_build_messages"):
+            messages = self.worker_agent._build_messages(payload)
+        else:
+            return count_tokens(payload)
+        return sum(count_tokens(message["content"]) for message in messages)
+
+    def _report_tokens(self, i, usage):
+        """
+        Print the tokens used by an interaction and by the evaluation so far.
+        """
+        budget = f" of {self.token_budget}" if self.token_budget is not None else ""
+        print(f"[TOKENS] Interaction {i+1}: {usage['per_iteration'][-1]} tokens, {usage['total']}{budget} total")
+
+    def _compact_correction_prompt(self, initial_prompt, response, instructions):
+        """
+        Build a shorter correction prompt: the feedback is cut down to its first distinct
+        lines within COMPACT_FEEDBACK_TOKENS, and the framing text is kept to a minimum.
+        The instructions left out are logged.
+        """
+        distinct = list(dict.fromkeys(line.strip() for line in instructions.splitlines() if line.strip()))
+        lines, tokens = [], 0
+        for line in distinct:
+            tokens += count_tokens(line)
+            if lines and tokens > self.COMPACT_FEEDBACK_TOKENS:
+                break
+            lines.append(line)
+        dropped = distinct[len(lines):]
+        if dropped:
+            print(f"[TOKEN BUDGET] The compacted prompt leaves out {len(dropped)} of {len(distinct)} instruction lines:")
+            for line in dropped:
+                print(f"  - {line}")
+        return (
+            f"Prompt: {initial_prompt}\n"
+            f"Your answer: {response}\n"
+            f"Correct only these issues and return the full answer: {' '.join(lines)}"
+        )
+
+    def _judge(self, response, scope="response"):
+        """
+        Sub-generator of the evaluation loop that judges one response and returns its
+        verdict: 'passed', 'evaluation' (the judge's text), 'scores' and 'instructions'.
+        In "text" mode the instructions are left empty for the loop to request separately.
+        Responses failing a local validator are rejected here without calling the judge.
+        With scope "item" (a single item of an incremental evaluation), validators and
+        rubric criteria about the response as a whole are left out; scope "overall" runs
+        only those, before the response is split into items.
+        """
+        failures = run_validators(self.validators, response) if scope != "item" else []
+        if failures:
+            print("[PRE-VALIDATION FAILED] Rejected by local checks, judge not called.")
+            problems = [problem for _, validator_problems in failures for problem in validator_problems]
+            return {
+                "passed": False,
+                "evaluation": "No, the answer fails these structural checks:\n" + "\n".join(problems),
+                "scores": {},
+                "instructions": build_fix_instructions(failures)
+            }
+
+        if scope == "overall":
+            rubric = [item for item in self.rubric if item.get("scope") == "response"]
+            if not rubric:
+                return {"passed": True, "evaluation": "The response passes its whole-response checks.",
+                        "scores": {}, "instructions": ""}
+        else:
+            rubric = [item for item in self.rubric if scope == "response" or item.get("scope") != "response"]
+        if rubric:
+            verdicts = yield from self._judge_criteria(response, [item["criterion"] for item in rubric])
+            verdict = combine_verdicts(
+                [item["name"] for item in rubric], verdicts, self.acceptance, self.min_score
+            )
+            return {
+                "passed": verdict["passed"],
+                "evaluation": verdict["reason"],
+                "scores": verdict["scores"],
+                "instructions": verdict["instructions"]
+            }
+
+        if self.verdict_format == "json":
+            verdict, = yield from self._judge_criteria(response, [self.evaluation_criteria])
+            return {
+                "passed": verdict["passed"],
+                "evaluation": verdict["reason"],
+                "scores": verdict["scores"],
+                "instructions": verdict["instructions"]
+            }
+
+        cache_key = self._verdict_key("text", self.evaluation_criteria, response)
+        cached = self.verdict_cache.get(cache_key) if self.verdict_cache is not None else None
+        if cached is not None:
+            print("[VERDICT CACHE] Reused the verdict, judge not called.")
+            return dict(cached)
+        eval_prompt = (
+            f"Does the following answer: {response}\n"
+            f"Meet this criteria: {self.evaluation_criteria} "  # TODO: 4 - Insert evaluation criteria here
+            f"Respond Yes or No, and the reason why it does or doesn't meet the criteria."
+        )
+        evaluation, = yield [("judge", [  # TODO: 5 - Define the message structure sent to the LLM for evaluation (use temperature=0)
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": eval_prompt}
+        ])]
+        evaluation = evaluation.strip()
+        verdict = {
+            "passed": evaluation.lower().startswith("yes"),
+            "evaluation": evaluation,
+            "scores": {},
+            "instructions": ""
+        }
+        if self.verdict_cache is not None:
+            self.verdict_cache.set(cache_key, dict(verdict))
+        return verdict
+
+    def _judge_criteria(self, response, criteria):
+        """
+        Sub-generator returning structured verdicts (see verdicts.parse_verdict) of a
+        response against each of several criteria, judged concurrently. Verdicts found
+        in the verdict cache are reused without a judge call.
+        """
+        keys = [self._verdict_key("json", criterion, response) for criterion in criteria]
+        verdicts = [self.verdict_cache.get(key) if self.verdict_cache is not None else None for key in keys]
+        verdicts = [dict(verdict) if verdict is not None else None for verdict in verdicts]
+        missing = [index for index, verdict in enumerate(verdicts) if verdict is None]
+        if len(missing) < len(criteria):
+            print(f"[VERDICT CACHE] Reused {len(criteria) - len(missing)} of {len(criteria)} verdicts.")
+        if missing:
+            replies = yield [("judge", self._json_verdict_messages(response, criteria[index])) for index in missing]
+            for index, reply in zip(missing, replies):
+                verdict = parse_verdict(reply)
+                verdict["reason"] = verdict["reason"] or reply.strip()
+                verdicts[index] = verdict
+                if self.verdict_cache is not None:
+                    self.verdict_cache.set(keys[index], dict(verdict))
+        return verdicts
+
+    def _verdict_key(self, verdict_format, criteria, response):
+        """
+        Build the verdict cache key of a response judged against some criteria. The
+        judge's endpoint is part of the key, so verdicts of one endpoint (e.g. the local
+        fake server) are never reused by a judge on another.
+        """
+        response_hash = hashlib.sha256(response.encode("utf-8")).hexdigest()
+        endpoint = getattr(self.client, "base_url", None)
+        return ResponseCache.make_key("verdict", endpoint, verdict_format, self.persona, criteria, response_hash)
+
+    def _instruction_messages(self, evaluation):
+        """
+        Build the judge messages asking for instructions to fix a rejected answer.
+        """
+        instruction_prompt = (
+            f"Provide instructions to fix an answer based on these reasons why it is incorrect: {evaluation}"
+        )
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": instruction_prompt}
+        ]
+
+    def _json_verdict_messages(self, response, criteria):
+        """
+        Build the judge messages asking for a structured JSON verdict on some criteria.
+        """
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": build_json_verdict_prompt(response, criteria)}
+        ]
+
+    @staticmethod
+    def _gather(steps):
+        """
+        Sub-generator that advances several loop sub-generators side by side, merging the
+        calls they yield at each step into one batch. Returns their return values in order.
+        """
+        results = [None] * len(steps)
+        pending = {index: None for index in range(len(steps))}  # value to send to each unfinished step
+        while pending:
+            batch = []
+            for index, value in list(pending.items()):
+                try:
+                    batch.append((index, steps[index].send(value)))
+                except StopIteration as stop:
+                    results[index] = stop.value
+                    del pending[index]
+            if not batch:
+                break
+            replies = yield [call for _, calls in batch for call in calls]
+            position = 0
+            for index, calls in batch:
+                pending[index] = replies[position:position + len(calls)]
+                position += len(calls)
+        return results
+
+    @staticmethod
+    def _select_candidate(verdicts):
+        """
+        Return the index of the best verdict: passing before failing, then by mean score,
+        then the earliest.
+        """
+        def rank(index):
+            scores = verdicts[index]["scores"]
+            mean_score = sum(scores.values()) / len(scores) if scores else 0
+            return (verdicts[index]["passed"], mean_score, -index)
+        return max(range(len(verdicts)), key=rank)
+
+    def _run_sync(self, steps):
+        """
+        Drive an evaluation loop generator, executing its calls with blocking I/O. Calls
+        yielded together run concurrently in a thread pool.
+        """
+        results = None
+        try:
+            while True:
+                calls = steps.send(results)
+                if len(calls) > 1:
+                    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+                        results = list(executor.map(self._call_sync, calls))
+                else:
+                    results = [self._call_sync(call) for call in calls]
+        except StopIteration as stop:
+            return stop.value
+
+    async def _run_async(self, steps):
+        """
+        Drive an evaluation loop generator, awaiting its calls concurrently.
+        """
+        results = None
+        try:
+            while True:
+                calls = steps.send(results)
+                results = await asyncio.gather(*(self._call_async(call) for call in calls))
+        except StopIteration as stop:
+            return stop.value
+
+    def _call_sync(self, call):
+        """
+        Execute one ("worker" | "candidate" | "judge", payload) call synchronously.
+        """
+        kind, payload = call
+        if kind == "worker":
+            return self.worker_agent.respond(payload)
+        if kind == "candidate":
+            return self.worker_agent.respond(payload, temperature=self.candidate_temperature)
+        return self.client.chat(messages=payload, temperature=0)
+
+    async def _call_async(self, call):
+        """
+        Execute one ("worker" | "candidate" | "judge", payload) call asynchronously. Workers
+        without an arespond() method are run in a thread so they do not block the event loop.
+        """
+        kind, payload = call
+        if kind in ("worker", "candidate"):
+            options = {"temperature": self.candidate_temperature} if kind == "candidate" else {}
+            if hasattr(self.worker_agent, "arespond"):
+                return await self.worker_agent.arespond(payload, **options)
+            return await asyncio.to_thread(self.worker_agent.respond, payload, **options)
+        return await self.client.achat(messages=payload, temperature=0)
+
 class RoutingAgent:
     """
     An agent capable of directing user prompts to the most appropriate specialized agent
@@ -398,19 +1227,54 @@ class RoutingAgent:
     
     Use Case: Intelligent task distribution in multi-agent systems where different
     agents have different specializations or capabilities.
+    
+    Route descriptions are embedded once, when routes are assigned or registered, and
+    kept as a normalized matrix. A description is only re-embedded after it changes.
     """
 
-    def __init__(self, openai_api_key, agents):
+    def __init__(self, openai_api_key, agents, client=None):
         """
         Initialize the RoutingAgent.
         
         Args:
             openai_api_key (str): OpenAI API key for authentication
             agents (list): List of agent dictionaries with 'name', 'description', and 'func'
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
         """
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
+        self._description_embeddings = {}
+        self._route_descriptions = ()
+        self._route_matrix = np.empty((0, 0))
         self.agents = agents
 
+    @property
+    def agents(self):
+        """
+        list: Route dictionaries with 'name', 'description', and 'func'.
+        """
+        return self._agents
+
+    @agents.setter
+    def agents(self, agents):
+        """
+        Assign the routes and embed any description not embedded yet.
+        """
+        self._agents = agents
+        self._route_embeddings()
+
+    def register_route(self, name, description, func, **route):
+        """
+        Add a single route and embed its description.
+        
+        Args:
+            name (str): Name of the route
+            description (str): What the route handles, used for similarity matching
+            func (callable): Function called with the user input when the route is selected
+            **route: Extra route keys (e.g. 'afunc')
+        """
+        self.agents = list(self._agents) + [dict(name=name, description=description, func=func, **route)]
+
     def get_embedding(self, text):
         """
         Calculate text embeddings using OpenAI's embedding model.
@@ -421,14 +1285,19 @@ class RoutingAgent:
         Returns:
             list: Embedding vector for the input text
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text,
-            encoding_format="float"
-        )
-        embedding = response.data[0].embedding
-        return embedding 
+        return self.client.embed(text)
+
+    async def aget_embedding(self, text):
+        """
+        Asynchronous counterpart of get_embedding().
+        
+        Args:
+            text (str): Text to embed
+            
+        Returns:
+            list: Embedding vector for the input text
+        """
+        return await self.client.aembed(text)
 
     def route(self, user_input):
         """
@@ -436,7 +1305,7 @@ class RoutingAgent:
         
         This method:
         1. Computes embedding for user input
-        2. Computes embeddings for all agent descriptions
+        2. Looks up the cached, normalized embeddings of all agent descriptions
         3. Calculates cosine similarity between input and each agent
         4. Selects agent with highest similarity score
         5. Calls the selected agent's function
@@ -448,27 +1317,187 @@ class RoutingAgent:
             str: Response from the selected agent
         """
         input_emb = self.get_embedding(user_input)
-        best_agent = None
-        best_score = -1
+        best_agent = self._select_agent(input_emb, self._route_embeddings())
 
-        for agent in self.agents:
-            agent_emb = self.get_embedding(agent["description"])
-            if agent_emb is None:
-                continue
+        if best_agent is None:
+            return "Sorry, no suitable agent could be selected."
 
-            # Calculate cosine similarity
-            similarity = np.dot(input_emb, agent_emb) / (np.linalg.norm(input_emb) * np.linalg.norm(agent_emb))
-            print(f"Agent: {agent['name']}, Similarity: {similarity}")
+        return best_agent["func"](user_input)
 
-            if similarity > best_score:
-                best_score = similarity
-                best_agent = agent
+    async def aroute(self, user_input):
+        """
+        Asynchronous counterpart of route().
+        
+        A route may provide an 'afunc' coroutine function which is awaited instead of
+        'func'. Synchronous route functions are run in a thread so they do not block
+        the event loop.
+        
+        Args:
+            user_input (str): User prompt to route
+            
+        Returns:
+            str: Response from the selected agent
+        """
+        input_emb = await self.aget_embedding(user_input)
+        best_agent = self._select_agent(input_emb, await self._aroute_embeddings())
 
         if best_agent is None:
             return "Sorry, no suitable agent could be selected."
 
-        print(f"[Router] Best agent: {best_agent['name']} (score={best_score:.3f})")
-        return best_agent["func"](user_input)
+        return await self._adispatch(best_agent, user_input)
+
+    def route_many(self, prompts, dispatch=False):
+        """
+        Route a batch of prompts at once.
+        
+        All prompts are embedded in a single batched embeddings request and scored
+        against every route with one matrix multiplication.
+        
+        Args:
+            prompts (list): User prompts to route
+            dispatch (bool): If True, also call each selected route's function
+            
+        Returns:
+            list: One decision per prompt (in input order), a dictionary with 'prompt',
+            'name' and 'route' of the selected route (None if no route is available),
+            its 'score', the 'scores' of every route by name and, when dispatching,
+            the 'response' of the selected route
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        prompt_embs = self.client.embed(prompts)
+        decisions = self._select_agents(prompts, prompt_embs, self._route_embeddings())
+
+        if dispatch:
+            for decision in decisions:
+                route = decision["route"]
+                decision["response"] = (
+                    route["func"](decision["prompt"]) if route is not None
+                    else "Sorry, no suitable agent could be selected."
+                )
+        return decisions
+
+    async def aroute_many(self, prompts, dispatch=False):
+        """
+        Asynchronous counterpart of route_many(). When dispatching, the selected routes
+        run concurrently.
+        
+        Args:
+            prompts (list): User prompts to route
+            dispatch (bool): If True, also call each selected route's function
+            
+        Returns:
+            list: One decision dictionary per prompt, as returned by route_many()
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        prompt_embs = await self.client.aembed(prompts)
+        decisions = self._select_agents(prompts, prompt_embs, await self._aroute_embeddings())
+
+        if dispatch:
+            async def respond(decision):
+                if decision["route"] is None:
+                    return "Sorry, no suitable agent could be selected."
+                return await self._adispatch(decision["route"], decision["prompt"])
+
+            responses = await asyncio.gather(*(respond(decision) for decision in decisions))
+            for decision, response in zip(decisions, responses):
+                decision["response"] = response
+        return decisions
+
+    async def _adispatch(self, agent, user_input):
+        """
+        Call a route asynchronously, preferring its 'afunc' coroutine function.
+        """
+        if "afunc" in agent:
+            return await agent["afunc"](user_input)
+        if inspect.iscoroutinefunction(agent["func"]):
+            return await agent["func"](user_input)
+        return await asyncio.to_thread(agent["func"], user_input)
+
+    def _select_agent(self, input_emb, route_matrix):
+        """
+        Return the agent whose description embedding is most similar to the input.
+        """
+        if len(self._agents) == 0:
+            return None
+
+        # Cosine similarity against every route at once: rows of route_matrix are unit vectors
+        similarities = route_matrix @ normalize_vector(input_emb)
+        for agent, similarity in zip(self._agents, similarities):
+            print(f"Agent: {agent['name']}, Similarity: {similarity}")
+
+        best_index = int(np.argmax(similarities))
+        best_agent = self._agents[best_index]
+        print(f"[Router] Best agent: {best_agent['name']} (score={similarities[best_index]:.3f})")
+        return best_agent
+
+    def _select_agents(self, prompts, prompt_embs, route_matrix):
+        """
+        Score a batch of prompt embeddings against all routes and build one decision
+        per prompt.
+        """
+        if len(self._agents) == 0:
+            return [
+                {"prompt": prompt, "name": None, "route": None, "score": None, "scores": {}}
+                for prompt in prompts
+            ]
+
+        prompt_matrix = np.vstack([normalize_vector(emb) for emb in prompt_embs])
+        similarities = prompt_matrix @ route_matrix.T  # (prompts x routes) cosine similarities
+        best_indices = np.argmax(similarities, axis=1)
+
+        decisions = []
+        for prompt, row, best_index in zip(prompts, similarities, best_indices):
+            best_agent = self._agents[best_index]
+            decisions.append({
+                "prompt": prompt,
+                "name": best_agent["name"],
+                "route": best_agent,
+                "score": float(row[best_index]),
+                "scores": {agent["name"]: float(score) for agent, score in zip(self._agents, row)}
+            })
+            print(f"[Router] {prompt[:60]!r} -> {best_agent['name']} (score={row[best_index]:.3f})")
+        return decisions
+
+    def _route_embeddings(self):
+        """
+        Return the normalized description matrix (one row per route), embedding any
+        description not cached yet in a single batched request. Descriptions are re-read
+        on each call, so a description edited in place is picked up and re-embedded.
+        """
+        descriptions = tuple(agent["description"] for agent in self._agents)
+        if descriptions != self._route_descriptions:
+            missing = [d for d in dict.fromkeys(descriptions) if d not in self._description_embeddings]
+            embeddings = self.client.embed(missing) if missing else []
+            self._update_route_matrix(descriptions, dict(zip(missing, embeddings)))
+        return self._route_matrix
+
+    async def _aroute_embeddings(self):
+        """
+        Asynchronous counterpart of _route_embeddings().
+        """
+        descriptions = tuple(agent["description"] for agent in self._agents)
+        if descriptions != self._route_descriptions:
+            missing = [d for d in dict.fromkeys(descriptions) if d not in self._description_embeddings]
+            embeddings = await self.client.aembed(missing) if missing else []
+            self._update_route_matrix(descriptions, dict(zip(missing, embeddings)))
+        return self._route_matrix
+
+    def _update_route_matrix(self, descriptions, new_embeddings):
+        """
+        Store newly fetched description embeddings, drop those no longer in use and
+        rebuild the route matrix.
+        """
+        for description, embedding in new_embeddings.items():
+            self._description_embeddings[description] = normalize_vector(embedding)
+        self._description_embeddings = {d: self._description_embeddings[d] for d in descriptions}
+        self._route_matrix = (
+            np.vstack([self._description_embeddings[d] for d in descriptions]) if descriptions else np.empty((0, 0))
+        )
+        self._route_descriptions = descriptions
 
 
 class ActionPlanningAgent:
@@ -481,15 +1510,17 @@ class ActionPlanningAgent:
     and task decomposition in agentic systems.
     """
 
-    def __init__(self, openai_api_key, knowledge):
+    def __init__(self, openai_api_key, knowledge, client=None):
         """
         Initialize the ActionPlanningAgent.
         
         Args:
             openai_api_key (str): OpenAI API key for authentication
             knowledge (str): Domain-specific knowledge for step extraction
+            client (LLMClient, optional): Shared LLM client; defaults to the process-wide client
         """
         self.openai_api_key = openai_api_key
+        self.client = client or get_shared_client(openai_api_key)
         self.knowledge = knowledge
 
     def extract_steps_from_prompt(self, prompt):
@@ -508,8 +1539,58 @@ class ActionPlanningAgent:
         Returns:
             list: Clean list of actionable steps extracted from the prompt
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
+        response_text = self.client.chat(messages=self._build_messages(prompt), temperature=0)
+        return self._parse_steps(response_text)
+
+    async def aextract_steps_from_prompt(self, prompt):
+        """
+        Asynchronous counterpart of extract_steps_from_prompt().
+        
+        Args:
+            prompt (str): User prompt describing a task or goal
+            
+        Returns:
+            list: Clean list of actionable steps extracted from the prompt
+        """
+        response_text = await self.client.achat(messages=self._build_messages(prompt), temperature=0)
+        return self._parse_steps(response_text)
+
+    def extract_plan_from_prompt(self, prompt, routes=None):
+        """
+        Extract a structured plan from a user prompt: typed steps with dependencies, so a
+        scheduler can tell which steps may run in parallel.
         
+        Args:
+            prompt (str): User prompt describing a task or goal
+            routes (list, optional): Route dictionaries ('name', 'description') or names the
+                planner may suggest for each step
+            
+        Returns:
+            list: Validated step dictionaries with 'id', 'text', 'route' (a route name or None)
+            and 'depends_on' (ids of earlier steps), de-duplicated and in execution order
+        """
+        response_text = self.client.chat(messages=self._build_plan_messages(prompt, routes), temperature=0)
+        return parse_plan(response_text, self._route_names(routes))
+
+    async def aextract_plan_from_prompt(self, prompt, routes=None):
+        """
+        Asynchronous counterpart of extract_plan_from_prompt().
+        
+        Args:
+            prompt (str): User prompt describing a task or goal
+            routes (list, optional): Route dictionaries ('name', 'description') or names the
+                planner may suggest for each step
+            
+        Returns:
+            list: Validated step dictionaries with 'id', 'text', 'route' and 'depends_on'
+        """
+        response_text = await self.client.achat(messages=self._build_plan_messages(prompt, routes), temperature=0)
+        return parse_plan(response_text, self._route_names(routes))
+
+    def _build_messages(self, prompt):
+        """
+        Build the chat messages asking the LLM to extract steps from a prompt.
+        """
         # Define system prompt with role and knowledge constraints
         system_prompt = (
             f"You are an action planning agent. Using your knowledge, you extract from the user prompt "
@@ -518,17 +1599,32 @@ class ActionPlanningAgent:
             f"This is your knowledge: {self.knowledge}"
         )
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0
-        )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _build_plan_messages(self, prompt, routes):
+        """
+        Build the chat messages asking the LLM for a structured JSON plan.
+        """
+        messages = self._build_messages(prompt)
+        messages[0]["content"] += " " + build_plan_instructions(routes)
+        return messages
 
-        response_text = response.choices[0].message.content
+    @staticmethod
+    def _route_names(routes):
+        """
+        Return the names of the given routes, or None if no routes were given.
+        """
+        if not routes:
+            return None
+        return [route["name"] if isinstance(route, dict) else str(route) for route in routes]
 
+    def _parse_steps(self, response_text):
+        """
+        Split the LLM completion into a list of non-empty steps.
+        """
         # Clean and format the extracted steps
         steps = response_text.split("\n")
         cleaned_steps = [step.strip() for step in steps if step.strip()]
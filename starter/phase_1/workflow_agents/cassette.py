@@ -0,0 +1,230 @@
+"""
+Record/Replay Cassettes
+
+This module records the chat and embedding requests made through an LLMClient,
+together with their responses and latencies, into a compact cassette file, and plays
+them back later without network access. A cassette is a gzip-compressed JSON Lines
+file keyed by a digest of each request; embedding vectors are stored as base64
+float32 arrays. Replays can be instantaneous or follow a latency model (the recorded
+latencies, or a fixed delay), so orchestration overhead can be measured offline.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import atexit
+import base64
+import gzip
+import json
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from .response_cache import ResponseCache
+
+
+class CassetteMissError(LookupError):
+    """
+    Raised in replay mode for a request that the cassette did not record.
+    """
+
+
+class Cassette:
+    """
+    A recording of LLM requests and responses.
+
+    In "record" mode every request sent by the client is appended to the cassette as
+    soon as its response arrives. In "replay" mode requests are answered from the
+    cassette; identical requests recorded several times (e.g. sampled candidates) are
+    answered in recorded order, the last answer repeating once they are used up.
+
+    Use Case: Reproducible, offline runs of the workflow and the demo scripts, and a
+    deterministic backend for profiling orchestration overhead.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, path, mode="replay", latency=None, latency_scale=1.0):
+        """
+        Initialize the Cassette.
+
+        Args:
+            path (str): The cassette file
+            mode (str): "record" (start a new recording) or "replay"
+            latency (str or float, optional): Replay latency model: None answers
+                immediately, "recorded" waits for the recorded latency of each call and
+                a number waits that many seconds for every call
+            latency_scale (float): Factor applied to every replay delay
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {self.MODES}")
+        if not (latency is None or latency == "recorded" or isinstance(latency, (int, float))):
+            raise ValueError(f"Unknown latency model {latency!r}, expected None, 'recorded' or seconds")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self._entries = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._file = None
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cassette from the LLM_CASSETTE (path), LLM_CASSETTE_MODE (default
+        "replay") and LLM_CASSETTE_LATENCY ("recorded" or seconds) environment variables.
+
+        Returns:
+            Cassette: The configured cassette, or None if LLM_CASSETTE is not set
+        """
+        path = os.getenv("LLM_CASSETTE")
+        if not path:
+            return None
+        latency = os.getenv("LLM_CASSETTE_LATENCY") or None
+        if latency is not None and latency != "recorded":
+            latency = float(latency)
+        return cls(path, mode=os.getenv("LLM_CASSETTE_MODE", "replay"), latency=latency)
+
+    @property
+    def replaying(self):
+        """
+        bool: True in replay mode.
+        """
+        return self.mode == "replay"
+
+    @staticmethod
+    def make_key(kind, request):
+        """
+        Build the cassette key of a request.
+
+        Args:
+            kind (str): "chat" or "embed"
+            request (dict): The request parameters (model, messages or input, ...)
+
+        Returns:
+            str: A short hex digest of the request
+        """
+        return ResponseCache.make_key(kind, request)[:32]
+
+    def record(self, kind, request, response, duration):
+        """
+        Append a request and its response to the cassette.
+
+        Args:
+            kind (str): "chat" or "embed"
+            request (dict): The request parameters
+            response: The chat content (str) or the embedding vector(s)
+            duration (float): The latency of the call in seconds
+        """
+        entry = {"k": self.make_key(kind, request), "t": kind, "d": round(duration, 4),
+                 "r": _encode_vectors(response) if kind == "embed" else response}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = gzip.open(self.path, "wt", encoding="utf-8")
+                atexit.register(self.close)
+            self._file.write(line)
+            self._file.flush()
+            self._entries[entry["k"]].append(entry)
+            self.recorded += 1
+
+    def replay(self, kind, request):
+        """
+        Look up the recorded response to a request.
+
+        Args:
+            kind (str): "chat" or "embed"
+            request (dict): The request parameters
+
+        Returns:
+            tuple: (response, delay) where delay is the number of seconds the caller
+            should wait according to the latency model
+
+        Raises:
+            CassetteMissError: If the request was not recorded
+        """
+        key = self.make_key(kind, request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"Request not found in cassette {self.path}: {kind} {key}")
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.replayed += 1
+        entry = entries[min(position, len(entries) - 1)]
+        response = _decode_vectors(entry["r"]) if kind == "embed" else entry["r"]
+        return response, self._delay(entry)
+
+    def _delay(self, entry):
+        """
+        Return the replay delay of an entry under the latency model.
+        """
+        if self.latency is None:
+            return 0.0
+        delay = entry.get("d", 0.0) if self.latency == "recorded" else self.latency
+        return delay * self.latency_scale
+
+    def stats(self):
+        """
+        Return the cassette counters.
+
+        Returns:
+            dict: 'mode', 'requests' (distinct recorded requests), 'recorded' and 'replayed'
+        """
+        return {"mode": self.mode, "requests": len(self._entries), "recorded": self.recorded,
+                "replayed": self.replayed}
+
+    def close(self):
+        """
+        Finish the recording. Safe to call more than once.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _load(self):
+        """
+        Read the cassette file. A line cut short by an interrupted recording is ignored.
+        """
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path} (record it first)")
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._entries[entry["k"]].append(entry)
+        except EOFError:
+            pass  # the recording was interrupted before the gzip trailer was written
+
+
+def _encode_vectors(vectors):
+    """
+    Pack one embedding vector or a list of them as base64 float32.
+    """
+    single = bool(vectors) and not isinstance(vectors[0], (list, tuple))
+    array = np.asarray([vectors] if single else vectors, dtype=np.float32)
+    return {"single": single, "shape": list(array.shape),
+            "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def _decode_vectors(packed):
+    """
+    Unpack vectors stored by _encode_vectors() into Python lists.
+    """
+    array = np.frombuffer(base64.b64decode(packed["data"]), dtype=np.float32).reshape(packed["shape"])
+    vectors = array.astype(float).tolist()
+    return vectors[0] if packed["single"] else vectors
@@ -0,0 +1,234 @@
+"""
+Text Chunking Engine
+
+This module splits documents into overlapping, token-sized chunks for embedding. Text
+is consumed as a stream (a string, a file object or any iterator of strings), split
+on paragraph and sentence boundaries and packed greedily into chunks of at most
+`chunk_size` tokens. Consecutive chunks share up to `chunk_overlap` tokens of whole
+sentences. Every chunk contains at least one sentence that the previous chunk did
+not, so chunking always makes forward progress and runs in linear time. A chunk's
+text is the exact span of the source given by its start and end offsets.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import re
+from collections import deque
+
+from .tokens import count_tokens
+
+# A boundary is either a paragraph break (blank line) or whitespace after end punctuation
+_BOUNDARY = re.compile(r"(?P<paragraph>[ \t\r\f\v]*\n[ \t\r\f\v]*\n\s*)|(?<=[.!?])\s+")
+_WORD = re.compile(r"\S+")
+
+# Text without any boundary is force-split once the buffer grows past this many characters
+_MAX_BUFFER_CHARS = 65536
+
+
+class _Unit:
+    """
+    A sentence (or a piece of an oversized sentence) with its token count, its
+    character span in the source and the whitespace separating it from the previous
+    unit (counted only when both units end up in the same chunk).
+    """
+
+    __slots__ = ("text", "tokens", "start", "end", "paragraph_start", "gap", "gap_tokens")
+
+    def __init__(self, text, start, paragraph_start, gap=""):
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.start = start
+        self.end = start + len(text)
+        self.paragraph_start = paragraph_start
+        self.gap = gap
+        self.gap_tokens = count_tokens(gap)
+
+
+def iter_chunks(source, chunk_size=500, chunk_overlap=25):
+    """
+    Lazily split a text stream into token-sized chunks.
+
+    Args:
+        source (str, file or iterable): The whole text, an open text file, or an
+            iterator yielding consecutive pieces of text
+        chunk_size (int): Maximum tokens per chunk
+        chunk_overlap (int): Maximum tokens of whole sentences repeated from the previous chunk
+
+    Yields:
+        dict: Chunk metadata with 'chunk_id', 'text', 'chunk_size' (characters),
+        'token_count', 'start_char' and 'end_char' (span in the source)
+    """
+    if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+        raise ValueError(f"Need 0 <= chunk_overlap < chunk_size, got {chunk_overlap} and {chunk_size}")
+
+    window = deque()
+    window_tokens = 0
+    carried = 0  # units at the front of the window that were already in the previous chunk
+    chunk_id = 0
+
+    for unit in _iter_units(source, chunk_size):
+        # Close the chunk when the unit does not fit, or early at a paragraph break
+        closes = window_tokens + _added_tokens(window, unit) > chunk_size or (
+            unit.paragraph_start and window_tokens >= chunk_size // 2
+        )
+        if closes and len(window) > carried:
+            yield _make_chunk(chunk_id, window)
+            chunk_id += 1
+            # Carry trailing sentences worth at most chunk_overlap tokens into the next chunk
+            carry = deque()
+            carry_tokens = 0
+            for previous in reversed(window):
+                tokens = previous.tokens + (carry[0].gap_tokens if carry else 0)
+                if carry_tokens + tokens > chunk_overlap or len(carry) + 1 >= len(window):
+                    break
+                carry.appendleft(previous)
+                carry_tokens += tokens
+            window, window_tokens, carried = carry, carry_tokens, len(carry)
+
+        # Drop carried sentences that would leave no room for the new one
+        while carried and window_tokens + _added_tokens(window, unit) > chunk_size:
+            window_tokens -= window.popleft().tokens
+            if window:
+                window_tokens -= window[0].gap_tokens  # the new first unit starts the chunk
+            carried -= 1
+
+        window_tokens += _added_tokens(window, unit)
+        window.append(unit)
+
+    if len(window) > carried:
+        yield _make_chunk(chunk_id, window)
+
+
+def _added_tokens(window, unit):
+    """
+    Return the tokens a unit adds to a window: its own, plus its leading whitespace
+    unless it starts the chunk.
+    """
+    return unit.tokens + (unit.gap_tokens if window else 0)
+
+
+def _make_chunk(chunk_id, window):
+    """
+    Join the units of a window, with the source whitespace between them, into a chunk dictionary.
+    """
+    units = iter(window)
+    text = next(units).text + "".join(unit.gap + unit.text for unit in units)
+    return {
+        "chunk_id": chunk_id,
+        "text": text,
+        "chunk_size": len(text),
+        "token_count": sum(unit.tokens + unit.gap_tokens for unit in window) - window[0].gap_tokens,
+        "start_char": window[0].start,
+        "end_char": window[-1].end
+    }
+
+
+def _iter_pieces(source):
+    """
+    Yield consecutive pieces of text from a string, file object or iterator.
+    """
+    if isinstance(source, str):
+        yield source
+    elif hasattr(source, "read"):
+        while True:
+            piece = source.read(_MAX_BUFFER_CHARS)
+            if not piece:
+                break
+            yield piece
+    else:
+        yield from source
+
+
+def _iter_units(source, chunk_size):
+    """
+    Stream sentence units (each at most chunk_size tokens) out of the source.
+    """
+    buffer = ""
+    offset = 0  # position of buffer[0] in the source
+    paragraph_start = True
+    gap = ""  # source whitespace since the end of the last unit
+
+    for piece in _iter_pieces(source):
+        buffer += piece
+        consumed = 0
+        for match in _BOUNDARY.finditer(buffer):
+            if match.end() == len(buffer):
+                break  # the whitespace run may continue in the next piece
+            sentence = buffer[consumed:match.start()]
+            gap = yield from _split_unit(sentence, offset + consumed, paragraph_start, chunk_size, gap)
+            gap += match.group()
+            if sentence.strip():
+                paragraph_start = False
+            if match.group("paragraph") is not None:
+                paragraph_start = True
+            consumed = match.end()
+
+        if len(buffer) - consumed > _MAX_BUFFER_CHARS:
+            # No boundary in sight: split at the last space (if any) to keep the buffer bounded
+            cut = buffer.rfind(" ", consumed)
+            if cut <= consumed:
+                cut = len(buffer)
+            gap = yield from _split_unit(buffer[consumed:cut], offset + consumed, paragraph_start, chunk_size, gap)
+            paragraph_start = False
+            consumed = cut
+
+        buffer = buffer[consumed:]
+        offset += consumed
+
+    yield from _split_unit(buffer, offset, paragraph_start, chunk_size, gap)
+
+
+def _split_unit(raw, start, paragraph_start, chunk_size, gap):
+    """
+    Split a raw sentence into units of at most chunk_size tokens, each spanning its own
+    slice of the source. `gap` is the whitespace preceding the sentence; the whitespace
+    left after its last unit is returned.
+    """
+    text = raw.strip()
+    if not text:
+        return gap + raw
+    lead = len(raw) - len(raw.lstrip())
+    gap += raw[:lead]
+    start += lead
+
+    unit = _Unit(text, start, paragraph_start, gap)
+    if unit.tokens <= chunk_size:
+        yield unit
+        return raw[lead + len(text):]
+
+    # Oversized sentence: pack words while the span (whitespace included) fits,
+    # splitting any single word that is still too long
+    first = last = None  # span of the packed words in text
+    for word_start, word_end in _iter_words(text, chunk_size):
+        if first is not None and count_tokens(text[first:word_end]) > chunk_size:
+            yield _Unit(text[first:last], start + first, paragraph_start, gap)
+            paragraph_start = False
+            gap = text[last:word_start]
+            first = None
+        if first is None:
+            first = word_start
+        last = word_end
+    yield _Unit(text[first:last], start + first, paragraph_start, gap)
+    return raw[lead + len(text):]
+
+
+def _iter_words(text, chunk_size):
+    """
+    Yield the (start, end) spans of the words of a text, cutting words longer than
+    chunk_size tokens into the longest pieces that fit.
+    """
+    for word in _WORD.finditer(text):
+        position, end = word.start(), word.end()
+        while count_tokens(text[position:end]) > chunk_size:
+            # Binary search for the longest prefix of the rest of the word that fits
+            low, high = 1, end - position
+            while low < high:
+                middle = (low + high + 1) // 2
+                if count_tokens(text[position:position + middle]) <= chunk_size:
+                    low = middle
+                else:
+                    high = middle - 1
+            yield position, position + low
+            position += low
+        yield position, end
@@ -0,0 +1,171 @@
+"""
+Embedding Ingestion Pipeline
+
+This module embeds large collections of text chunks efficiently. Chunks are packed
+into batched embeddings requests bounded by token count and input count, batches
+run concurrently under a configurable cap, and every finished batch is written to a
+progress directory so that an interrupted ingestion resumes where it stopped.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .tokens import count_tokens
+
+
+class EmbeddingIngestor:
+    """
+    Embeds a list of texts in token-bounded batches with bounded concurrency and
+    resumable progress.
+
+    Use Case: Indexing thousands of knowledge chunks for the RAGKnowledgePromptAgent
+    without sending one request per chunk, one at a time.
+    """
+
+    def __init__(self, client, max_batch_tokens=50000, max_batch_size=256, concurrency=4):
+        """
+        Initialize the EmbeddingIngestor.
+
+        Args:
+            client (LLMClient): Client used for the embeddings requests
+            max_batch_tokens (int): Maximum total tokens per embeddings request
+            max_batch_size (int): Maximum number of texts per embeddings request
+            concurrency (int): Maximum number of requests in flight at once
+        """
+        self.client = client
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+
+    def plan_batches(self, texts):
+        """
+        Greedily pack consecutive texts into batches. A text larger than the token
+        bound on its own still gets a batch of its own.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            list: (start, end) index ranges, one per batch, covering all texts in order
+        """
+        batches = []
+        start, batch_tokens = 0, 0
+        for index, text in enumerate(texts):
+            tokens = count_tokens(text)
+            batch_full = index - start >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens
+            if index > start and batch_full:
+                batches.append((start, index))
+                start, batch_tokens = index, 0
+            batch_tokens += tokens
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def ingest(self, texts, progress_dir=None):
+        """
+        Embed all texts, blocking until done. Must not be called from a running event
+        loop; use aingest() there instead.
+
+        Args:
+            texts (list): Texts to embed
+            progress_dir (str, optional): Directory for resumable progress; None disables resume
+
+        Returns:
+            np.ndarray: float32 matrix with one embedding row per text
+        """
+        return asyncio.run(self._ingest_and_close(texts, progress_dir))
+
+    async def _ingest_and_close(self, texts, progress_dir):
+        """
+        Run aingest() in the private event loop of ingest(), closing the client's
+        connection pool of that loop before the loop ends (async pools are per loop, so
+        it could not be reused by a later call anyway).
+        """
+        try:
+            return await self.aingest(texts, progress_dir)
+        finally:
+            await self.client.aclose()
+
+    async def aingest(self, texts, progress_dir=None):
+        """
+        Asynchronous counterpart of ingest().
+
+        Args:
+            texts (list): Texts to embed
+            progress_dir (str, optional): Directory for resumable progress; None disables resume
+
+        Returns:
+            np.ndarray: float32 matrix with one embedding row per text
+        """
+        texts = list(texts)
+        batches = self.plan_batches(texts)
+        results = [None] * len(batches)
+
+        if progress_dir is not None:
+            self._prepare_progress_dir(progress_dir, texts, batches)
+            for batch_index in range(len(batches)):
+                part_path = self._part_path(progress_dir, batch_index)
+                if os.path.exists(part_path):
+                    results[batch_index] = np.load(part_path)
+            resumed = sum(result is not None for result in results)
+            if resumed:
+                print(f"[Ingestion] Resuming: {resumed}/{len(batches)} batches already embedded")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        completed = sum(result is not None for result in results)
+
+        async def embed_batch(batch_index):
+            nonlocal completed
+            start, end = batches[batch_index]
+            async with semaphore:
+                vectors = await self.client.aembed(texts[start:end])
+            matrix = np.asarray(vectors, dtype=np.float32)
+            if progress_dir is not None:
+                part_path = self._part_path(progress_dir, batch_index)
+                np.save(f"{part_path}.tmp.npy", matrix)
+                os.replace(f"{part_path}.tmp.npy", part_path)
+            results[batch_index] = matrix
+            completed += 1
+            print(f"[Ingestion] Batch {completed}/{len(batches)} embedded ({end - start} chunks)")
+
+        await asyncio.gather(*(embed_batch(i) for i, result in enumerate(results) if result is None))
+
+        if progress_dir is not None:
+            shutil.rmtree(progress_dir, ignore_errors=True)
+        return np.vstack(results) if results else np.empty((0, 0), dtype=np.float32)
+
+    def _prepare_progress_dir(self, progress_dir, texts, batches):
+        """
+        Create the progress directory, discarding stale progress from different input.
+        """
+        digest = hashlib.sha256()
+        for text in texts:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\0")
+        manifest = {"fingerprint": digest.hexdigest(), "batches": batches}
+
+        manifest_path = os.path.join(progress_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                if json.load(file) == json.loads(json.dumps(manifest)):
+                    return
+            shutil.rmtree(progress_dir)
+
+        os.makedirs(progress_dir, exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+
+    @staticmethod
+    def _part_path(progress_dir, batch_index):
+        """
+        Return the file holding the embeddings of one finished batch.
+        """
+        return os.path.join(progress_dir, f"batch-{batch_index:05d}.npy")
@@ -0,0 +1,364 @@
+"""
+Local OpenAI-Compatible Stand-In Server
+
+This module provides a small local server implementing the two OpenAI endpoints the
+workflow_agents library uses, `/chat/completions` and `/embeddings`, for load testing
+the shared client, its retries and the concurrency of the agents without network
+access or API costs. Responses are deterministic: chat replies are synthesized from
+the request (judges accept, planners get a JSON plan) and embeddings are
+fixed-dimension unit vectors seeded by the text. Latency follows a configurable
+distribution, and a configurable share of requests fails with 429 or 5xx errors.
+
+Run it with `python -m workflow_agents.fake_server --port 8000` and point the agents
+at it with OPENAI_BASE_URL=http://127.0.0.1:8000/v1.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .tokens import count_tokens
+
+LATENCY_KINDS = ("constant", "uniform", "normal", "lognormal")
+
+
+class LatencyDistribution:
+    """
+    A seeded distribution of response latencies.
+
+    Use Case: Emulating the latency profile of a real endpoint, including its long
+    tail, when load testing against the FakeLLMServer.
+    """
+
+    def __init__(self, kind="constant", mean=0.0, spread=0.0, seed=0):
+        """
+        Initialize the LatencyDistribution.
+
+        Args:
+            kind (str): "constant", "uniform" (mean ± spread), "normal" (standard
+                deviation spread) or "lognormal" (median mean, shape spread)
+            mean (float): Mean (median for "lognormal") latency in seconds
+            spread (float): Spread of the distribution (see kind)
+            seed (int): Random seed, so a load test can be repeated exactly
+        """
+        if kind not in LATENCY_KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}', expected one of {LATENCY_KINDS}")
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=0):
+        """
+        Build a distribution from a compact specification such as "0.05",
+        "uniform:0.05,0.02" or "lognormal:0.3,0.5" (kind:mean,spread).
+
+        Args:
+            spec (str): The specification
+            seed (int): Random seed
+
+        Returns:
+            LatencyDistribution: The distribution
+        """
+        kind, _, values = spec.rpartition(":")
+        numbers = [float(value) for value in values.split(",") if value.strip()] or [0.0]
+        return cls(kind or "constant", numbers[0], numbers[1] if len(numbers) > 1 else 0.0, seed)
+
+    def sample(self):
+        """
+        Draw one latency in seconds (never negative).
+        """
+        with self._lock:
+            if self.kind == "uniform":
+                value = self._random.uniform(self.mean - self.spread, self.mean + self.spread)
+            elif self.kind == "normal":
+                value = self._random.gauss(self.mean, self.spread)
+            elif self.kind == "lognormal":
+                value = self.mean * self._random.lognormvariate(0.0, self.spread) if self.mean > 0 else 0.0
+            else:
+                value = self.mean
+        return max(0.0, value)
+
+
+def synthetic_reply(messages, model):
+    """
+    Build a deterministic chat reply for a request. Judges (JSON or Yes/No verdicts)
+    accept the answer, planners receive a three-step JSON plan and every other prompt
+    gets a short answer derived from its content.
+
+    Args:
+        messages (list): Chat messages in OpenAI format
+        model (str): The requested model
+
+    Returns:
+        str: The reply content
+    """
+    system = " ".join(message["content"] for message in messages if message["role"] == "system")
+    prompt = messages[-1]["content"] if messages else ""
+    digest = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+    if '"passed"' in system or '"passed"' in prompt:
+        return json.dumps({"passed": True, "scores": {"overall": 9},
+                           "reason": "The answer meets the criteria.", "instructions": ""})
+    if '"steps"' in system:
+        topic = " ".join(prompt.split()[:12])
+        steps = [f"Analyze the request: {topic}", f"Draft a solution for: {topic}", f"Review the solution for: {topic}"]
+        return json.dumps({"steps": [
+            {"id": str(number), "text": text, "depends_on": [str(number - 1)] if number > 1 else []}
+            for number, text in enumerate(steps, start=1)
+        ]})
+    if "Respond Yes or No" in prompt:
+        return "Yes, the answer meets the criteria."
+    return f"Synthetic answer {digest}: " + " ".join(prompt.split()[:40])
+
+
+def synthetic_embedding(text, dimensions):
+    """
+    Return a deterministic unit vector for a text.
+
+    Args:
+        text (str): The text to embed
+        dimensions (int): The vector dimension
+
+    Returns:
+        list: The embedding vector
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeLLMServer:
+    """
+    A threaded local server speaking the OpenAI chat completions and embeddings API.
+
+    Use Case: Load testing the shared LLMClient, its retry logic and the concurrency
+    of the agents with deterministic responses and controllable latency and errors.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, responder=None, latency=None, error_rate=0.0,
+                 error_statuses=(429, 500, 503), embedding_dimensions=256, seed=0):
+        """
+        Initialize the FakeLLMServer.
+
+        Args:
+            host (str): Interface to listen on
+            port (int): Port to listen on; 0 picks a free port
+            responder (callable, optional): Called as responder(messages, model) to build
+                chat replies; defaults to synthetic_reply()
+            latency (LatencyDistribution or str, optional): Latency added to every
+                request (a LatencyDistribution or a specification for
+                LatencyDistribution.parse()); None answers immediately
+            error_rate (float): Share of requests (0 to 1) answered with an error
+            error_statuses (tuple): HTTP statuses the injected errors are drawn from
+            embedding_dimensions (int): Dimension of the embedding vectors
+            seed (int): Random seed for latencies and injected errors
+        """
+        if isinstance(latency, str):
+            latency = LatencyDistribution.parse(latency, seed)
+        self.responder = responder or synthetic_reply
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.embedding_dimensions = embedding_dimensions
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "chat": 0, "embeddings": 0, "errors": 0,
+                          "prompt_tokens": 0, "completion_tokens": 0}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """
+        str: The base URL to give an LLMClient (or OPENAI_BASE_URL).
+        """
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+
+        Returns:
+            str: The base URL of the server
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """
+        Serve requests from the calling thread until interrupted.
+        """
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """
+        Stop serving and release the port.
+        """
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """
+        Return the request counters.
+
+        Returns:
+            dict: 'requests', 'chat', 'embeddings', 'errors', 'prompt_tokens' and
+            'completion_tokens' served so far
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset_stats(self):
+        """
+        Reset the request counters to zero.
+        """
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def _count(self, **increments):
+        """
+        Add to the request counters.
+        """
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def _draw_error(self):
+        """
+        Return an HTTP status to fail the current request with, or None.
+        """
+        if self.error_rate <= 0:
+            return None
+        with self._lock:
+            if self._random.random() >= self.error_rate:
+                return None
+            return self._random.choice(self.error_statuses)
+
+    def _chat(self, body):
+        """
+        Build a chat completion response.
+        """
+        messages, model = body.get("messages", []), body.get("model", "")
+        content = self.responder(messages, model)
+        prompt_tokens = sum(count_tokens(str(message.get("content") or "")) for message in messages)
+        completion_tokens = count_tokens(content)
+        self._count(chat=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return {
+            "id": f"chatcmpl-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def _embeddings(self, body):
+        """
+        Build an embeddings response.
+        """
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        dimensions = body.get("dimensions") or self.embedding_dimensions
+        prompt_tokens = sum(count_tokens(str(text)) for text in texts)
+        self._count(embeddings=1, prompt_tokens=prompt_tokens)
+        return {
+            "object": "list",
+            "model": body.get("model", ""),
+            "data": [{"object": "embedding", "index": index, "embedding": synthetic_embedding(str(text), dimensions)}
+                     for index, text in enumerate(texts)],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Request handler of the FakeLLMServer (reached through self.server.fake).
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY, delayed ACKs add ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fake._count(requests=1)
+        if fake.latency is not None:
+            time.sleep(fake.latency.sample())
+
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            handler = fake._chat
+        elif path.endswith("/embeddings"):
+            handler = fake._embeddings
+        else:
+            self._send(404, {"error": {"message": f"Unknown endpoint {self.path}", "type": "invalid_request_error"}})
+            return
+
+        status = fake._draw_error()
+        if status is not None:
+            fake._count(errors=1)
+            error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._send(status, {"error": {"message": f"Injected {status} error", "type": error_type, "code": status}})
+            return
+        self._send(200, handler(body))
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # keep load tests quiet
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="0", help='e.g. "0.05", "uniform:0.05,0.02" or "lognormal:0.3,0.5"')
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 429/5xx")
+    parser.add_argument("--embedding-dimensions", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+                           embedding_dimensions=args.embedding_dimensions, seed=args.seed)
+    print(f"Fake OpenAI-compatible server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
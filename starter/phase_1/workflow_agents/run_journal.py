@@ -0,0 +1,149 @@
+"""
+Workflow Run Journal
+
+This module checkpoints agentic workflow runs to an append-only JSON Lines file, one
+file per run ID. The plan, every step's routing decision and every finished step's
+result are appended (and flushed to disk) as soon as they are known. Reopening a
+journal with the same run ID gives back the plan, the routing and the completed
+results, so an interrupted run resumes without redoing finished work. A line cut
+short by a crash is ignored when the journal is read.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+
+class RunJournal:
+    """
+    An append-only record of one workflow run.
+
+    Use Case: Resuming a long, paid-for workflow run after a crash or interruption
+    instead of re-planning and re-executing every step.
+    """
+
+    def __init__(self, path, run_id):
+        """
+        Initialize the RunJournal. Use open() to create or resume a run.
+
+        Args:
+            path (str): The journal file
+            run_id (str): The run ID
+        """
+        self.path = path
+        self.run_id = run_id
+        self.plan = None
+        self.prompt = None
+        self.routing = {}
+        self.results = {}
+        self._lock = threading.Lock()
+        self._partial_line = False
+        if os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def open(cls, directory, run_id=None):
+        """
+        Open the journal of a run, creating a new run if no run ID is given.
+
+        Args:
+            directory (str): Directory holding the journals, one `<run_id>.jsonl` per run
+            run_id (str, optional): The run to resume
+
+        Returns:
+            RunJournal: The journal
+        """
+        if run_id is None:
+            run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f"{run_id}.jsonl"), run_id)
+
+    @property
+    def resumed(self):
+        """
+        bool: True if the journal already held a plan when it was opened.
+        """
+        return self.plan is not None
+
+    def record_plan(self, plan, prompt=None):
+        """
+        Record the plan of the run.
+
+        Args:
+            plan (list): Step dictionaries (see plans.py)
+            prompt (str, optional): The workflow prompt the plan was made for
+        """
+        self.plan, self.prompt = plan, prompt
+        self._append({"type": "plan", "prompt": prompt, "plan": plan})
+
+    def record_routing(self, step_id, route_name, score=None):
+        """
+        Record the route selected for a step.
+
+        Args:
+            step_id (str): The step id
+            route_name (str): Name of the selected route
+            score (float, optional): The routing similarity score
+        """
+        self.routing[step_id] = route_name
+        self._append({"type": "routing", "step_id": step_id, "route": route_name, "score": score})
+
+    def record_result(self, record):
+        """
+        Record a finished step (a WorkflowEngine step record).
+
+        Args:
+            record (dict): Step record with 'id', 'status', 'result', 'error' and 'duration'
+        """
+        entry = {"type": "result", "step_id": record["id"], "status": record["status"],
+                 "result": record["result"], "error": record["error"], "duration": record["duration"]}
+        if record["status"] == "completed":
+            self.results[record["id"]] = record["result"]
+        self._append(entry)
+
+    def completed_results(self):
+        """
+        Return {step id: result} for the steps completed in this run so far.
+        """
+        return dict(self.results)
+
+    def _append(self, entry):
+        """
+        Append one timestamped entry and force it to disk.
+        """
+        entry = dict(entry, time=datetime.now().isoformat(timespec="seconds"))
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._partial_line:
+                line, self._partial_line = "\n" + line, False
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _load(self):
+        """
+        Replay the journal file. Later entries override earlier ones, so a step that
+        failed and later completed counts as completed.
+        """
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                self._partial_line = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a partial line left by a crash
+                if entry["type"] == "plan":
+                    self.plan, self.prompt = entry["plan"], entry.get("prompt")
+                elif entry["type"] == "routing":
+                    self.routing[entry["step_id"]] = entry["route"]
+                elif entry["type"] == "result":
+                    if entry["status"] == "completed":
+                        self.results[entry["step_id"]] = entry["result"]
+                    else:
+                        self.results.pop(entry["step_id"], None)
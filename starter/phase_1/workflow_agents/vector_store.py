@@ -0,0 +1,151 @@
+"""
+Vector Store
+
+This module persists chunk embeddings for the RAGKnowledgePromptAgent in a binary
+format: a float32 NumPy matrix (`<path>.npy`, one row per chunk) plus a compact
+JSON Lines sidecar (`<path>.jsonl`, one metadata record per chunk, in row order).
+The matrix is memory-mapped when reopened, so queries never re-parse text files.
+A FlatIndex keeps a pre-normalized copy of the matrix resident for top-k search.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+class VectorStore:
+    """
+    An embedding matrix and the chunk metadata describing each of its rows.
+
+    Use Case: Storing and reloading RAG knowledge embeddings without converting
+    vectors to and from text.
+    """
+
+    def __init__(self, embeddings, chunks):
+        """
+        Initialize the VectorStore.
+
+        Args:
+            embeddings (array-like): Matrix of shape (num_chunks, dim)
+            chunks (list): Metadata dictionaries (e.g. 'chunk_id', 'text'), one per row
+        """
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.chunks = list(chunks)
+        if self.embeddings.ndim != 2 or len(self.embeddings) != len(self.chunks):
+            raise ValueError(
+                f"Expected one embedding row per chunk, got matrix {self.embeddings.shape} "
+                f"for {len(self.chunks)} chunks"
+            )
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def save(self, path):
+        """
+        Write the store to `<path>.npy` and `<path>.jsonl`.
+
+        Args:
+            path (str): Path prefix of the store files
+        """
+        np.save(f"{path}.npy", self.embeddings)
+        with open(f"{path}.jsonl", "w", encoding="utf-8") as file:
+            for chunk in self.chunks:
+                file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open a store written by save().
+
+        Args:
+            path (str): Path prefix of the store files
+            mmap (bool): Memory-map the embedding matrix instead of reading it into memory
+
+        Returns:
+            VectorStore: The reopened store
+        """
+        embeddings = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        with open(f"{path}.jsonl", "r", encoding="utf-8") as file:
+            chunks = [json.loads(line) for line in file if line.strip()]
+        return cls(embeddings, chunks)
+
+    @staticmethod
+    def exists(path):
+        """
+        Return True if both store files exist for the given path prefix.
+        """
+        return os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.jsonl")
+
+
+class FlatIndex:
+    """
+    An exact (brute-force) cosine-similarity index over a VectorStore. Rows are
+    normalized once when the index is built, so a query costs one matrix-vector
+    product plus a partial sort.
+
+    Use Case: Serving many retrieval queries against one resident corpus.
+    """
+
+    def __init__(self, store):
+        """
+        Initialize the FlatIndex.
+
+        Args:
+            store (VectorStore): The embeddings and chunk metadata to index
+        """
+        self.store = store
+        norms = np.linalg.norm(store.embeddings, axis=1, keepdims=True)
+        self.matrix = (store.embeddings / np.where(norms == 0, 1, norms)).astype(np.float32, copy=False)
+
+    def __len__(self):
+        return len(self.store)
+
+    def search(self, query_embedding, k=5):
+        """
+        Find the k chunks most similar to a query embedding.
+
+        Args:
+            query_embedding (array-like): The query vector
+            k (int): Number of results to return
+
+        Returns:
+            list: Up to k chunk metadata dictionaries, each with an added 'score'
+            (cosine similarity), most similar first
+        """
+        if len(self.matrix) == 0:
+            return []
+        scores = self.matrix @ normalize_vector(query_embedding)
+        return _top_k(self.store.chunks, scores, k)
+
+
+def normalize_vector(vector):
+    """
+    Scale a vector to unit length, as float32 like the stored embeddings.
+
+    Args:
+        vector (array-like): The vector
+
+    Returns:
+        np.ndarray: The unit-length vector (a zero vector is returned unchanged)
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _top_k(chunks, scores, k, ids=None):
+    """
+    Select the k best-scoring chunks with a partial sort (argpartition) and order them.
+    `ids` maps each score to its chunk row when only a subset of chunks was scored.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    rows = top if ids is None else ids[top]
+    return [dict(chunks[row], score=float(scores[i])) for row, i in zip(rows, top)]
@@ -0,0 +1,268 @@
+"""
+Structured Evaluation Verdicts
+
+This module builds and parses the structured verdicts used by the EvaluationAgent in
+"json" mode. The judge is asked for a single JSON object holding the pass/fail
+decision, per-criterion scores, the reason and the instructions to fix the answer, so
+one judge call replaces the separate verdict and instruction calls. Judges do not
+always return clean JSON, so the parser accepts code fences, surrounding prose,
+trailing commas, alternative key names and, as a last resort, a plain Yes/No answer.
+Multi-criterion rubrics can be split into single criteria judged independently, and
+their verdicts combined under an acceptance rule.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import json
+import re
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+_PASSED_KEYS = ("passed", "pass", "accepted", "meets_criteria", "verdict", "result")
+_REASON_KEYS = ("reason", "reasons", "explanation", "evaluation", "feedback")
+_INSTRUCTION_KEYS = ("instructions", "fix_instructions", "corrections", "fixes", "suggestions")
+_POSITIVE = ("yes", "pass", "passed", "true", "accept", "accepted", "meets")
+
+_RUBRIC_ITEM = re.compile(r"^\s*\d+[.)]\s+(?P<item>\S.*)$")
+_RUBRIC_NAME = re.compile(r"^[*_\s]*(?P<name>[^(:*_]+?)[*_\s]*(?:\(|:)")
+# Point weights such as "(2 points)"; criteria are scored from 1 to 10 (see JSON_VERDICT_TEMPLATE)
+_RUBRIC_POINTS = re.compile(r"\s*\(\s*\d+(?:\.\d+)?\s*(?:points?|pts?)\s*\)", re.IGNORECASE)
+
+ACCEPTANCE_RULES = ("all", "any", "majority")
+
+JSON_VERDICT_TEMPLATE = (
+    '{"passed": true or false, '
+    '"scores": {"<criterion>": <score from 1 to 10>, ...}, '
+    '"reason": "<why the answer does or does not meet the criteria>", '
+    '"instructions": "<instructions to fix the answer, empty if it passed>"}'
+)
+
+
+def build_json_verdict_prompt(response, evaluation_criteria):
+    """
+    Build the judge prompt asking for a structured JSON verdict.
+
+    Args:
+        response (str): The worker response to judge
+        evaluation_criteria (str): The criteria the response must meet
+
+    Returns:
+        str: The user prompt for the judge
+    """
+    return (
+        f"Does the following answer: {response}\n"
+        f"Meet this criteria: {evaluation_criteria}\n"
+        f"Score the answer against each criterion and respond with only a JSON object of this form:\n"
+        f"{JSON_VERDICT_TEMPLATE}"
+    )
+
+
+def parse_verdict(text):
+    """
+    Parse a judge reply into a verdict dictionary. Replies without a usable JSON object
+    are read as plain text: they pass if they start with "Yes".
+
+    Args:
+        text (str): The raw judge reply
+
+    Returns:
+        dict: 'passed' (bool), 'scores' (dict of criterion -> float), 'reason' (str)
+        and 'instructions' (str, empty when the judge gave none)
+    """
+    text = (text or "").strip()
+    data = extract_json_object(text)
+    if data is None:
+        return {
+            "passed": _is_positive(text),
+            "scores": {},
+            "reason": text,
+            "instructions": ""
+        }
+
+    passed = next((data[key] for key in _PASSED_KEYS if key in data), None)
+    return {
+        "passed": _is_positive(passed),
+        "scores": _parse_scores(data.get("scores", data.get("criteria"))),
+        "reason": _as_text(next((data[key] for key in _REASON_KEYS if key in data), "")),
+        "instructions": _as_text(next((data[key] for key in _INSTRUCTION_KEYS if key in data), ""))
+    }
+
+
+def split_rubric(evaluation_criteria):
+    """
+    Split a numbered rubric ("1. Structure Compliance (2 points): ...") into criteria
+    that can be judged independently. The text before the first numbered item is shared
+    context and is repeated in every criterion. Point weights are removed, since every
+    criterion is scored from 1 to 10. Text after the list (e.g. overall acceptance
+    requirements such as a minimum number of items) becomes one more criterion, judged
+    against the response as a whole.
+
+    Args:
+        evaluation_criteria (str): The rubric text
+
+    Returns:
+        list: {'name', 'criterion', 'scope'} dictionaries, one per numbered item (scope
+        "item") plus one for the text after the list (scope "response"); a single "item"
+        entry holding the whole text if the rubric has no numbered items
+    """
+    context, items, trailing = [], [], []
+    for line in evaluation_criteria.strip().splitlines():
+        match = _RUBRIC_ITEM.match(line)
+        if trailing:
+            trailing.append(line)
+        elif match:
+            items.append(match.group("item").strip())
+        elif items and line.strip() and not trailing:
+            items[-1] += " " + line.strip()  # continuation of the previous item
+        elif items:
+            trailing.append(line)  # a blank line ends the list
+        else:
+            context.append(line)
+
+    if not items:
+        return [{"name": "criteria", "criterion": evaluation_criteria.strip(), "scope": "item"}]
+    context = "\n".join(context).strip()
+    rubric = []
+    for number, item in enumerate(items, start=1):
+        item = _RUBRIC_POINTS.sub("", item)
+        match = _RUBRIC_NAME.match(item)
+        rubric.append({
+            "name": match.group("name").strip() if match else f"criterion {number}",
+            "criterion": f"{context}\nJudge only this criterion: {item}" if context else item,
+            "scope": "item"
+        })
+    trailing = " ".join(line.strip() for line in trailing if line.strip())
+    if trailing:
+        requirement = f"Judge the response as a whole against this requirement: {trailing}"
+        rubric.append({
+            "name": "overall acceptance",
+            "criterion": f"{context}\n{requirement}" if context else requirement,
+            "scope": "response"
+        })
+    return rubric
+
+
+def combine_verdicts(names, verdicts, acceptance="all", min_score=None):
+    """
+    Combine per-criterion verdicts into one verdict.
+
+    Args:
+        names (list): Criterion names, in the order of `verdicts`
+        verdicts (list): Verdicts from parse_verdict(), one per criterion
+        acceptance (str or callable): "all", "any" or "majority" of the criteria must pass,
+            or a callable taking {name: verdict} and returning True to accept
+        min_score (float, optional): Also require the mean criterion score to reach this
+
+    Returns:
+        dict: A verdict with 'passed', 'scores' ({name: score}), 'reason' (one line per
+        criterion) and 'instructions' (those of the failing criteria)
+    """
+    by_name = dict(zip(names, verdicts))
+    passes = [verdict["passed"] for verdict in verdicts]
+    if callable(acceptance):
+        passed = bool(acceptance(by_name))
+    elif acceptance == "all":
+        passed = all(passes)
+    elif acceptance == "any":
+        passed = any(passes)
+    elif acceptance == "majority":
+        passed = sum(passes) * 2 > len(passes)
+    else:
+        raise ValueError(f"acceptance must be one of {ACCEPTANCE_RULES} or a callable, got {acceptance!r}")
+
+    scores = {}
+    for name, verdict in by_name.items():
+        if verdict["scores"]:
+            scores[name] = sum(verdict["scores"].values()) / len(verdict["scores"])
+    if min_score is not None:
+        passed = passed and bool(scores) and sum(scores.values()) / len(scores) >= min_score
+
+    reason = "\n".join(
+        f"{name}: {'PASS' if verdict['passed'] else 'FAIL'}"
+        + (f" ({scores[name]:g})" if name in scores else "")
+        + (f" - {verdict['reason']}" if verdict["reason"] else "")
+        for name, verdict in by_name.items()
+    )
+    instructions = "\n".join(
+        f"{name}: {verdict['instructions'] or verdict['reason']}"
+        for name, verdict in by_name.items() if not verdict["passed"]
+    )
+    return {"passed": passed, "scores": scores, "reason": reason, "instructions": instructions}
+
+
+def extract_json_object(text):
+    """
+    Find the first JSON object in an LLM reply (inside a code fence or not). Each
+    opening brace is tried as-is and with trailing commas removed, so an outer object
+    with a stray comma is not skipped in favour of one nested inside it.
+
+    Args:
+        text (str): The raw reply
+
+    Returns:
+        dict: The object with lower-cased keys, or None if the reply holds no JSON object
+    """
+    candidates = [match.group(1) for match in _FENCE.finditer(text)] + [text]
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            for attempt in (candidate[start:], _TRAILING_COMMA.sub(r"\1", candidate[start:])):
+                try:
+                    data, _ = decoder.raw_decode(attempt)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(data, dict):
+                    return {str(key).lower(): value for key, value in data.items()}
+            start = candidate.find("{", start + 1)
+    return None
+
+
+def _is_positive(value):
+    """
+    Interpret a verdict value (bool, number or text such as "Yes" / "PASS") as pass/fail.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value > 0
+    if isinstance(value, str):
+        return value.strip().lower().startswith(_POSITIVE)
+    return False
+
+
+def _parse_scores(scores):
+    """
+    Normalize scores given as {criterion: score} or [{"criterion": ..., "score": ...}].
+    Scores that are not numbers are dropped.
+    """
+    if isinstance(scores, list):
+        pairs = [
+            (item.get("criterion", item.get("name")), item.get("score"))
+            for item in scores if isinstance(item, dict)
+        ]
+    elif isinstance(scores, dict):
+        pairs = scores.items()
+    else:
+        return {}
+
+    parsed = {}
+    for name, score in pairs:
+        if isinstance(score, dict):
+            score = score.get("score")
+        try:
+            parsed[str(name)] = float(score)
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+
+def _as_text(value):
+    """
+    Flatten a reason or instruction value (text or list of texts) into a string.
+    """
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    return str(value).strip()
@@ -18,6 +18,14 @@ Date: January 2025
 
 # Import required agents from the workflow_agents library
 from workflow_agents.base_agents import ActionPlanningAgent, KnowledgeAugmentedPromptAgent, EvaluationAgent, RoutingAgent
+from workflow_agents.cassette import Cassette
+from workflow_agents.list_items import USER_STORY_ITEM
+from workflow_agents.llm_client import LLMClient, set_shared_client
+from workflow_agents.response_cache import ResponseCache
+from workflow_agents.run_journal import RunJournal
+from workflow_agents.validators import FieldBlockValidator, UserStoryValidator
+from workflow_agents.verdicts import split_rubric
+from workflow_agents.workflow_engine import WorkflowEngine
 
 import os
 from dotenv import load_dotenv
@@ -26,6 +34,18 @@ from dotenv import load_dotenv
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# Set LLM_CASSETTE (and LLM_CASSETTE_MODE=record) to record the run's LLM calls, or replay
+# a recording offline. With a cassette both caches below stay in memory, so a recording
+# holds every call of the run and a replay makes exactly the calls that were recorded.
+cassette = Cassette.from_env()
+
+# Share one pooled client across all agents, backed by a persistent response cache so that
+# re-running the workflow on the same product spec does not pay again for identical calls
+response_cache = ResponseCache(path=None if cassette else os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite"))
+set_shared_client(LLMClient(openai_api_key, cache=response_cache, cassette=cassette))
+# Judge verdicts are cached per (persona, criteria, response) so an unchanged response is never judged twice
+verdict_cache = ResponseCache(path=None if cassette else os.getenv("VERDICT_CACHE_PATH", "verdict_cache.sqlite"))
+
 # load the product spec
 # TODO: 3 - Load the product spec document Product-Spec-Email-Router.txt into a variable called product_spec
 with open("Product-Spec-Email-Router.txt", "r", encoding="utf-8") as file:
@@ -78,7 +98,13 @@ SCORING CRITERIA (Rate each story 1-10):
 MINIMUM ACCEPTABLE SCORE: 8/10 per story
 OVERALL ACCEPTANCE: All stories must score 8+ and there must be at least 5 diverse user stories covering different user types.
 """
-product_manager_evaluation_agent = EvaluationAgent(openai_api_key, persona_product_manager_eval, evaluation_criteria_product_manager, product_manager_knowledge_agent, 10)
+product_manager_evaluation_agent = EvaluationAgent(openai_api_key, persona_product_manager_eval, evaluation_criteria_product_manager, product_manager_knowledge_agent, 10, verdict_format="json", verdict_cache=verdict_cache,
+                                                   # At least 5 stories, checked on the whole response before it is split
+                                                   validators=[UserStoryValidator(min_stories=5)],
+                                                   # Score the five rubric criteria concurrently, one judge call each
+                                                   rubric=split_rubric(evaluation_criteria_product_manager), min_score=8,
+                                                   # Judge stories one by one and regenerate only the failing ones
+                                                   incremental=True, item_pattern=USER_STORY_ITEM)
 
 # Program Manager - Knowledge Augmented Prompt Agent
 persona_program_manager = "You are a Program Manager, you are responsible for defining the features for a product."
@@ -96,7 +122,8 @@ evaluation_criteria_program_manager = ("The answer should be product features th
                                       "Description: A brief explanation of what the feature does and its purpose\n" +
                                       "Key Functionality: The specific capabilities or actions the feature provides\n" +
                                       "User Benefit: How this feature creates value for the user")
-program_manager_evaluation_agent = EvaluationAgent(openai_api_key, persona_program_manager_eval, evaluation_criteria_program_manager, program_manager_knowledge_agent, 10)
+program_manager_evaluation_agent = EvaluationAgent(openai_api_key, persona_program_manager_eval, evaluation_criteria_program_manager, program_manager_knowledge_agent, 10, verdict_format="json", verdict_cache=verdict_cache,
+                                                   validators=[FieldBlockValidator(["Feature Name", "Description", "Key Functionality", "User Benefit"], block_name="Feature")])
 
 # Development Engineer - Knowledge Augmented Prompt Agent
 persona_dev_engineer = "You are a Development Engineer, you are responsible for defining the development tasks for a product."
@@ -116,7 +143,9 @@ evaluation_criteria_dev_engineer = ("The answer should be tasks following this e
                                    "Acceptance Criteria: Specific requirements that must be met for completion\n" +
                                    "Estimated Effort: Time or complexity estimation\n" +
                                    "Dependencies: Any tasks that must be completed first")
-development_engineer_evaluation_agent = EvaluationAgent(openai_api_key, persona_dev_engineer_eval, evaluation_criteria_dev_engineer, development_engineer_knowledge_agent, 10)
+development_engineer_evaluation_agent = EvaluationAgent(openai_api_key, persona_dev_engineer_eval, evaluation_criteria_dev_engineer, development_engineer_knowledge_agent, 10, verdict_format="json", verdict_cache=verdict_cache,
+                                                       validators=[FieldBlockValidator(["Task ID", "Task Title", "Related User Story", "Description",
+                                                                                        "Acceptance Criteria", "Estimated Effort", "Dependencies"], block_name="Task")])
 
 
 # Job function persona support functions
@@ -132,7 +161,8 @@ def product_manager_support_function(query):
     Support function for Product Manager - generates and evaluates user stories
     
     This function implements error handling and logging for robust workflow execution.
-    It handles API timeouts, evaluation failures, and other potential issues.
+    API timeouts, evaluation failures and other errors are logged and re-raised, so the
+    workflow engine marks the step as failed and skips the steps depending on it.
     """
     print(f"[Product Manager] Processing: {query}")
     
@@ -142,9 +172,10 @@ def product_manager_support_function(query):
         response = product_manager_knowledge_agent.respond(query)
         print(f"[Product Manager] Initial response generated successfully")
         
-        # Evaluate the response with error handling
+        # Evaluate the response with error handling (seeded with the response above, so the
+        # worker is not asked the same question twice)
         print(f"[Product Manager] Starting evaluation process...")
-        evaluation_result = product_manager_evaluation_agent.evaluate(query)
+        evaluation_result = product_manager_evaluation_agent.evaluate(query, initial_response=response)
         print(f"[Product Manager] Evaluation completed after {evaluation_result.get('iterations', 'unknown')} iterations")
         
         # Return the final validated response
@@ -153,14 +184,15 @@ def product_manager_support_function(query):
     except Exception as e:
         error_msg = f"[Product Manager] Error during processing: {str(e)}"
         print(f"{error_msg}")
-        # Return a fallback response instead of crashing the workflow
-        return f"Error in Product Manager processing: {str(e)}. Please review manually."
+        # Re-raise so the workflow engine records the step as failed (and a resumed run retries it)
+        raise
 
 def program_manager_support_function(query):
     """
     Support function for Program Manager - generates and evaluates product features
     
     This function implements error handling and logging for robust workflow execution.
+    Errors are logged and re-raised so the step is recorded as failed.
     """
     print(f"[Program Manager] Processing: {query}")
     
@@ -170,7 +202,7 @@ def program_manager_support_function(query):
         print(f"[Program Manager] Initial response generated successfully")
         
         print(f"[Program Manager] Starting evaluation process...")
-        evaluation_result = program_manager_evaluation_agent.evaluate(query)
+        evaluation_result = program_manager_evaluation_agent.evaluate(query, initial_response=response)
         print(f"[Program Manager] Evaluation completed after {evaluation_result.get('iterations', 'unknown')} iterations")
         
         return evaluation_result['final_response']
@@ -178,13 +210,14 @@ def program_manager_support_function(query):
     except Exception as e:
         error_msg = f"[Program Manager] Error during processing: {str(e)}"
         print(f"{error_msg}")
-        return f"Error in Program Manager processing: {str(e)}. Please review manually."
+        raise
 
 def development_engineer_support_function(query):
     """
     Support function for Development Engineer - generates and evaluates development tasks
     
     This function implements error handling and logging for robust workflow execution.
+    Errors are logged and re-raised so the step is recorded as failed.
     """
     print(f"[Development Engineer] Processing: {query}")
     
@@ -194,7 +227,7 @@ def development_engineer_support_function(query):
         print(f"[Development Engineer] Initial response generated successfully")
         
         print(f"[Development Engineer] Starting evaluation process...")
-        evaluation_result = development_engineer_evaluation_agent.evaluate(query)
+        evaluation_result = development_engineer_evaluation_agent.evaluate(query, initial_response=response)
         print(f"[Development Engineer] Evaluation completed after {evaluation_result.get('iterations', 'unknown')} iterations")
         
         return evaluation_result['final_response']
@@ -202,7 +235,7 @@ def development_engineer_support_function(query):
     except Exception as e:
         error_msg = f"[Development Engineer] Error during processing: {str(e)}"
         print(f"{error_msg}")
-        return f"Error in Development Engineer processing: {str(e)}. Please review manually."
+        raise
 
 # Routing Agent
 # TODO: 10 - Instantiate a routing_agent. You will need to define a list of agent dictionaries (routes) for Product Manager, Program Manager, and Development Engineer. Each dictionary should contain 'name', 'description', and 'func' (linking to a support function). Assign this list to the routing_agent's 'agents' attribute.
@@ -228,7 +261,7 @@ routes = [
     }
 ]
 
-# Assign routes to the routing agent
+# Assign routes to the routing agent (route descriptions are embedded once, here)
 routing_agent.agents = routes
 
 # Run the workflow
@@ -242,11 +275,25 @@ print(f"Task to complete in this workflow, workflow prompt = {workflow_prompt}")
 
 print("\nDefining workflow steps from the workflow prompt")
 # TODO: 12 - Implement the workflow.
-#   1. Use the 'action_planning_agent' to extract steps from the 'workflow_prompt'.
-workflow_steps = action_planning_agent.extract_steps_from_prompt(workflow_prompt)
+#   Every run is checkpointed to a journal; set WORKFLOW_RUN_ID to resume an interrupted run
+#   with its plan, routing and completed steps instead of starting over.
+run_journal = RunJournal.open(os.getenv("WORKFLOW_RUNS_DIR", "runs"), os.getenv("WORKFLOW_RUN_ID"))
+print(f"Run ID: {run_journal.run_id} (journal: {run_journal.path})")
+
+#   1. Use the 'action_planning_agent' to extract steps from the 'workflow_prompt'. The structured
+#      plan drops headings and duplicate steps and records which steps depend on which.
+if run_journal.resumed:
+    print("Resuming the journaled plan")
+    workflow_plan = run_journal.plan
+else:
+    workflow_plan = action_planning_agent.extract_plan_from_prompt(workflow_prompt, routes)
+    run_journal.record_plan(workflow_plan, workflow_prompt)
+workflow_steps = [plan_step["text"] for plan_step in workflow_plan]
 print(f"Extracted {len(workflow_steps)} workflow steps:")
-for i, step in enumerate(workflow_steps, 1):
-    print(f"  {i}. {step}")
+for i, plan_step in enumerate(workflow_plan, 1):
+    depends_on = f" (after {', '.join(plan_step['depends_on'])})" if plan_step["depends_on"] else ""
+    suggested = f" [{plan_step['route']}]" if plan_step["route"] else ""
+    print(f"  {i}. [{plan_step['id']}] {plan_step['text']}{suggested}{depends_on}")
 
 #   2. Initialize an empty list to store 'completed_steps'.
 completed_steps = []
@@ -256,22 +303,65 @@ print("EXECUTING AGENTIC WORKFLOW")
 print("="*80)
 
 #   3. Loop through the extracted workflow steps:
-for i, step in enumerate(workflow_steps, 1):
-    print(f"\n--- STEP {i}/{len(workflow_steps)} ---")
-    print(f"Executing: {step}")
+#      a. Route the whole plan in one shot: every step is embedded in a single batched request.
+#         A resumed run reuses the journaled routing decisions.
+routes_by_name = {route["name"]: route for route in routes}
+if all(run_journal.routing.get(plan_step["id"]) in routes_by_name for plan_step in workflow_plan):
+    routing_decisions = {
+        step_id: {"name": name, "route": routes_by_name[name], "score": None}
+        for step_id, name in run_journal.routing.items()
+    }
+else:
+    routing_decisions = dict(zip(
+        [plan_step["id"] for plan_step in workflow_plan], routing_agent.route_many(workflow_steps)
+    ))
+    for step_id, decision in routing_decisions.items():
+        run_journal.record_routing(step_id, decision["name"], decision["score"])
+
+def execute_step(plan_step, dependency_results):
+    """
+    Run one plan step through the support function of the route selected for it. The
+    results of the steps it depends on are passed along in the prompt, so that e.g. the
+    feature step groups the user stories actually produced by the earlier step.
+    """
+    decision = routing_decisions[plan_step["id"]]
+    print(f"\n--- STEP {plan_step['id']} ---")
+    print(f"Executing: {plan_step['text']}")
+    score = "journaled" if decision["score"] is None else f"score={decision['score']:.3f}"
+    print(f"Routed to: {decision['name']} ({score})")
     print("-" * 50)
-    
-    #      a. For each step, use the 'routing_agent' to route the step to the appropriate support function.
-    try:
-        result = routing_agent.route(step)
-        #      b. Append the result to 'completed_steps'.
+    if decision["route"] is None:
+        raise RuntimeError(f"No route available for step {plan_step['id']}")
+    query = plan_step["text"]
+    if dependency_results:
+        earlier_results = "\n\n".join(
+            f"Result of step {step_id}:\n{result}" for step_id, result in dependency_results.items()
+        )
+        query = f"{query}\n\nBuild on these results of earlier workflow steps:\n{earlier_results}"
+    return decision["route"]["func"](query)
+
+#      Steps run as soon as the steps they depend on are done, with their results in the prompt;
+#      independent steps run concurrently.
+#      Each finished step is journaled immediately; steps completed before a resume are not re-run.
+workflow_engine = WorkflowEngine(max_concurrency=int(os.getenv("WORKFLOW_CONCURRENCY", "4")))
+step_records = workflow_engine.run(workflow_plan, execute_step,
+                                   completed=run_journal.completed_results(),
+                                   on_finish=run_journal.record_result)
+
+for i, record in enumerate(step_records, 1):
+    #      b. Append the result to 'completed_steps'.
+    #      c. Print information about the step being executed and its result.
+    if record["status"] == "completed":
+        result = record["result"]
         completed_steps.append(result)
-        #      c. Print information about the step being executed and its result.
-        print(f"\nStep {i} completed successfully")
+        if record["resumed"]:
+            print(f"\nStep {i} completed in an earlier run (resumed from the journal)")
+        else:
+            print(f"\nStep {i} completed successfully in {record['duration']:.1f}s")
         print(f"Result preview: {result[:200]}..." if len(result) > 200 else f"Result: {result}")
-    except Exception as e:
-        print(f"Error in step {i}: {str(e)}")
-        completed_steps.append(f"Error: {str(e)}")
+    else:
+        print(f"Error in step {i}: {record['error']}")
+        completed_steps.append(f"Error: {record['error']}")
 
 #   4. After the loop, print the final output of the workflow (the last completed step).
 print("\n" + "="*80)
@@ -297,3 +387,10 @@ if completed_steps:
     print("\n The Email Router product is now ready for development with comprehensive planning!")
 else:
     print("No steps were completed successfully.")
+
+print(f"\nResponse cache: {response_cache.stats()}")
+print(f"Verdict cache: {verdict_cache.stats()}")
+if cassette:
+    cassette.close()
+    print(f"Cassette {cassette.path}: {cassette.stats()}")
+print(f"Run journal: {run_journal.path} (resume with WORKFLOW_RUN_ID={run_journal.run_id})")
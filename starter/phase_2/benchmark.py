@@ -0,0 +1,331 @@
+"""
+Agent and Workflow Benchmark
+
+This script benchmarks every agent of the workflow_agents library and the end-to-end
+agentic workflow against a deterministic local backend (the FakeLLMServer), so results
+do not depend on network conditions or API quotas. Each scenario mirrors one of the
+phase_1 test scripts (direct, augmented, knowledge-augmented, RAG, evaluation, routing
+and action planning) or runs agentic_workflow.py itself. Every scenario is run at
+several concurrency levels and reports p50/p95/p99 task latency, throughput, and the
+LLM calls and tokens spent per task. Results are written as JSON so that runs before
+and after a change can be compared (see --baseline).
+
+Usage:
+    python benchmark.py --concurrency 1,4,16 --tasks 32 --latency 0.05
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from workflow_agents.base_agents import (ActionPlanningAgent, AugmentedPromptAgent, DirectPromptAgent, EvaluationAgent,
+                                         KnowledgeAugmentedPromptAgent, RAGKnowledgePromptAgent, RoutingAgent)
+from workflow_agents.fake_server import FakeLLMServer
+from workflow_agents.llm_client import LLMClient, set_shared_client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKFLOW_SCRIPT = os.path.join(HERE, "agentic_workflow.py")
+PRODUCT_SPEC = os.path.join(HERE, "Product-Spec-Email-Router.txt")
+API_KEY = "benchmark"
+
+RAG_KNOWLEDGE = """
+In the historic city of Boston, Clara, a marine biologist and science communicator, began each morning analyzing sonar data to track whale migration patterns along the Atlantic coast.
+She spent her afternoons in a university lab, researching CRISPR-based gene editing to restore coral reefs damaged by ocean acidification and warming.
+Inspired by her parents' resilience and thirst for knowledge, Clara created a podcast called "Crosscurrents", a show that explored the intersection of science, culture, and ethics.
+Each week, she interviewed researchers, engineers, artists, and activists, from marine ecologists and AI ethicists to digital archivists preserving endangered languages.
+In one popular episode, she explored how retrieval-augmented generation (RAG) could help scientific researchers find niche studies buried in decades-old journals.
+Clara also used her technical skills to build Python-based dashboards that visualized ocean temperature anomalies and biodiversity loss.
+"""
+
+PLANNING_KNOWLEDGE = """
+1. Crack eggs into a bowl
+2. Beat eggs with a fork until mixed
+3. Heat pan with butter or oil over medium heat
+4. Pour egg mixture into pan
+5. Stir gently as eggs cook
+6. Remove from heat when eggs are just set but still moist
+7. Season with salt and pepper
+8. Serve immediately
+"""
+
+ROUTING_PROMPTS = [
+    "Tell me about the history of Rome, Texas",
+    "Tell me about the history of Rome, Italy",
+    "One story takes 2 days, and there are 20 stories"
+]
+
+
+def direct_scenario():
+    """
+    DirectPromptAgent answering a question (direct_prompt_agent.py).
+    """
+    agent = DirectPromptAgent(API_KEY)
+    return lambda index: agent.respond("What is the Capital of France?")
+
+
+def augmented_scenario():
+    """
+    AugmentedPromptAgent answering with a persona (augmented_prompt_agent.py).
+    """
+    agent = AugmentedPromptAgent(API_KEY, "You are a college professor; your answers always start with: 'Dear students,'")
+    return lambda index: agent.respond("What is the capital of France?")
+
+
+def knowledge_scenario():
+    """
+    KnowledgeAugmentedPromptAgent answering from provided knowledge (knowledge_augmented_prompt_agent.py).
+    """
+    agent = KnowledgeAugmentedPromptAgent(API_KEY, "You are a college professor, your answer always starts with: Dear students,",
+                                          "The capital of France is London, not Paris")
+    return lambda index: agent.respond("What is the capital of France?")
+
+
+def rag_scenario():
+    """
+    RAGKnowledgePromptAgent retrieving from an embedded text (rag_knowledge_prompt_agent.py).
+    Chunking and embedding the knowledge is setup; each task is one retrieval and answer.
+    """
+    agent = RAGKnowledgePromptAgent(API_KEY, "You are a college professor, your answer always starts with: Dear students,")
+    agent.chunk_text(RAG_KNOWLEDGE)
+    agent.calculate_embeddings()
+    return lambda index: agent.find_prompt_in_knowledge("What is the podcast that Clara hosts about?")
+
+
+def evaluation_scenario():
+    """
+    EvaluationAgent refining a knowledge agent's answer (evaluation_agent.py).
+    """
+    worker = KnowledgeAugmentedPromptAgent(API_KEY, "You are a college professor, your answer always starts with: Dear students,",
+                                           "The capitol of France is London, not Paris")
+    agent = EvaluationAgent(API_KEY, "You are an evaluation agent that checks the answers of other worker agents",
+                            "The answer should be solely the name of a city, not a sentence.", worker, 10)
+    return lambda index: agent.evaluate("What is the capital of France?")
+
+
+def routing_scenario():
+    """
+    RoutingAgent dispatching prompts to three knowledge agents (routing_agent.py).
+    Embedding the route descriptions is setup; each task routes and answers one prompt.
+    """
+    persona = "You are a college professor"
+    texas = KnowledgeAugmentedPromptAgent(API_KEY, persona, "You know everything about Texas")
+    europe = KnowledgeAugmentedPromptAgent(API_KEY, persona, "You know everything about Europe")
+    math = KnowledgeAugmentedPromptAgent(API_KEY, "You are a college math professor",
+                                         "You know everything about math, you take prompts with numbers, "
+                                         "extract math formulas, and show the answer without explanation")
+    agent = RoutingAgent(API_KEY, [])
+    agent.agents = [
+        {"name": "texas agent", "description": "Answer a question about Texas", "func": texas.respond},
+        {"name": "europe agent", "description": "Answer a question about Europe", "func": europe.respond},
+        {"name": "math agent", "description": "When a prompt contains numbers, respond with a math formula",
+         "func": math.respond}
+    ]
+    return lambda index: agent.route(ROUTING_PROMPTS[index % len(ROUTING_PROMPTS)])
+
+
+def planning_scenario():
+    """
+    ActionPlanningAgent extracting steps from knowledge (action_planning_agent.py).
+    """
+    agent = ActionPlanningAgent(API_KEY, PLANNING_KNOWLEDGE)
+    return lambda index: agent.extract_steps_from_prompt("One morning I wanted to have scrambled eggs")
+
+
+def run_workflow(index):
+    """
+    Run agentic_workflow.py once, in a worker process (the script builds its agents and
+    installs its shared client at module level, so concurrent runs cannot share a process).
+
+    Returns:
+        float: The duration of the run in seconds
+    """
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        runpy.run_path(WORKFLOW_SCRIPT, run_name="__main__")
+    return time.perf_counter() - started
+
+
+SCENARIOS = {
+    "direct": direct_scenario,
+    "augmented": augmented_scenario,
+    "knowledge": knowledge_scenario,
+    "rag": rag_scenario,
+    "evaluation": evaluation_scenario,
+    "routing": routing_scenario,
+    "action_planning": planning_scenario,
+    "workflow": None,  # agentic_workflow.py, run in worker processes
+}
+
+
+def run_level(name, tasks, concurrency, server):
+    """
+    Run one scenario at one concurrency level and measure it.
+
+    Args:
+        name (str): Scenario name (a key of SCENARIOS)
+        tasks (int): Number of tasks to run
+        concurrency (int): Number of tasks running at once
+        server (FakeLLMServer): The backend, whose counters give calls and tokens
+
+    Returns:
+        dict: The measurements of the level
+    """
+    durations, failures = [], 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if name == "workflow":
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+            submit = lambda index: executor.submit(run_workflow, index)
+        else:
+            task = SCENARIOS[name]()
+            task(0)  # untimed warm-up, so the first measured task does not pay for opening connections
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+            submit = lambda index: executor.submit(_timed, task, index)
+
+        server.reset_stats()  # setup and warm-up calls (e.g. embedding the RAG knowledge) are not measured
+        started = time.perf_counter()
+        with executor:
+            futures = [submit(index) for index in range(tasks)]
+            for future in futures:
+                try:
+                    durations.append(future.result())
+                except Exception:
+                    failures += 1
+        wall = time.perf_counter() - started
+    stats = server.stats()
+
+    calls = stats["chat"] + stats["embeddings"]
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "tasks": tasks,
+        "failures": failures,
+        "wall_seconds": round(wall, 4),
+        "throughput": round(len(durations) / wall, 3) if wall > 0 else None,
+        "latency": {"mean": None, "p50": None, "p95": None, "p99": None},
+        "calls_per_task": round(calls / tasks, 2),
+        "chat_calls_per_task": round(stats["chat"] / tasks, 2),
+        "embedding_calls_per_task": round(stats["embeddings"] / tasks, 2),
+        "tokens_per_task": round((stats["prompt_tokens"] + stats["completion_tokens"]) / tasks, 1),
+        "injected_errors": stats["errors"]
+    }
+    if durations:
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+        result["latency"] = {"mean": round(float(np.mean(durations)), 4), "p50": round(float(p50), 4),
+                             "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+    return result
+
+
+def _timed(task, index):
+    """
+    Run one task and return its duration in seconds.
+    """
+    started = time.perf_counter()
+    task(index)
+    return time.perf_counter() - started
+
+
+def print_results(results, baseline=None):
+    """
+    Print the results as a table, with the p50 latency and throughput change relative
+    to a baseline run where one is given.
+
+    Args:
+        results (list): Level results from run_level()
+        baseline (dict, optional): A previous results file, as loaded from JSON
+    """
+    previous = {(entry["scenario"], entry["concurrency"]): entry for entry in (baseline or {}).get("results", [])}
+    header = f"{'scenario':<16}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'tasks/s':>10}{'calls':>8}{'tokens':>9}{'fail':>6}"
+    print(header + ("   vs baseline (p50, tasks/s)" if previous else ""))
+    print("-" * len(header))
+    for entry in results:
+        latency = entry["latency"]
+        cells = [f"{latency[key] * 1000:>10.1f}" if latency[key] is not None else f"{'-':>10}" for key in ("p50", "p95", "p99")]
+        line = (f"{entry['scenario']:<16}{entry['concurrency']:>5}{''.join(cells)}{entry['throughput'] or 0:>10.2f}"
+                f"{entry['calls_per_task']:>8.2f}{entry['tokens_per_task']:>9.1f}{entry['failures']:>6}")
+        before = previous.get((entry["scenario"], entry["concurrency"]))
+        if before and before["latency"]["p50"] and latency["p50"] and before["throughput"] and entry["throughput"]:
+            line += (f"   {(latency['p50'] / before['latency']['p50'] - 1) * 100:+.1f}%"
+                     f", {(entry['throughput'] / before['throughput'] - 1) * 100:+.1f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workflow agents against a local fake backend")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--tasks", type=int, default=32, help="tasks per agent scenario and concurrency level")
+    parser.add_argument("--workflow-tasks", type=int, default=4, help="workflow runs per concurrency level")
+    parser.add_argument("--latency", default="0.05", help='backend latency, e.g. "0.05" or "lognormal:0.3,0.5"')
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of backend requests failing with 429/5xx")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="a previous results file to compare against")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}, expected some of {list(SCENARIOS)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    server = FakeLLMServer(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    base_url = server.start()
+    # Worker processes of the workflow scenario inherit this environment: the fake endpoint,
+    # throwaway in-memory caches (so no run is served from a previous run's cache) and no cassette
+    os.environ.update(OPENAI_API_KEY=API_KEY, OPENAI_BASE_URL=base_url,
+                      LLM_CACHE_PATH=":memory:", VERDICT_CACHE_PATH=":memory:")
+    os.environ.pop("LLM_CASSETTE", None)
+    os.environ.pop("WORKFLOW_RUN_ID", None)
+    set_shared_client(LLMClient(API_KEY, base_url=base_url))
+
+    # Agents write scratch files (RAG chunks, run journals) to the working directory
+    workdir = tempfile.mkdtemp(prefix="agent-benchmark-")
+    shutil.copy(PRODUCT_SPEC, workdir)
+    os.environ["WORKFLOW_RUNS_DIR"] = os.path.join(workdir, "runs")
+    os.chdir(workdir)
+
+    results = []
+    try:
+        for name in names:
+            tasks = args.workflow_tasks if name == "workflow" else args.tasks
+            for concurrency in levels:
+                print(f"Running {name} at concurrency {concurrency} ({tasks} tasks)...", file=sys.stderr)
+                results.append(run_level(name, tasks, concurrency, server))
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": {"latency": args.latency, "error_rate": args.error_rate, "seed": args.seed},
+        "results": results
+    }
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the workflow_agents package importable when pytest runs from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
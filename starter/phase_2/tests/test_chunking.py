@@ -0,0 +1,102 @@
+"""
+Tests for the streaming text chunker.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import io
+import random
+
+import pytest
+
+from workflow_agents.chunking import iter_chunks
+from workflow_agents.tokens import count_tokens
+
+
+def _sample_text():
+    """
+    Build a text mixing paragraphs, irregular whitespace, oversized sentences and
+    words longer than a chunk.
+    """
+    rng = random.Random(0)
+    words = ["email", "router", "support", "agent", "customer", "ticket", "priority", "queue"]
+    paragraphs = []
+    for _ in range(30):
+        sentences = []
+        for _ in range(rng.randint(1, 6)):
+            length = rng.choice([5, 12, 40, 300])
+            sentence = " ".join(rng.choice(words) for _ in range(length))
+            sentences.append(sentence.replace(" ", rng.choice([" ", "  ", "\n", " \t"]), 3) + ".")
+        paragraphs.append(rng.choice([" ", "  ", "\n"]).join(sentences))
+    paragraphs.insert(5, "x" * 5000 + " tail.")
+    return "  \n" + "\n\n\n".join(paragraphs) + "\n"
+
+
+def _pieces(text, size):
+    """
+    Yield a text in pieces of `size` characters.
+    """
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(50, 0), (50, 10), (200, 25), (500, 100)])
+@pytest.mark.parametrize("stream", ["string", "file", "pieces"])
+def test_chunk_offsets_match_source(chunk_size, chunk_overlap, stream):
+    text = _sample_text()
+    source = {"string": text, "file": io.StringIO(text), "pieces": _pieces(text, 97)}[stream]
+
+    chunks = list(iter_chunks(source, chunk_size, chunk_overlap))
+
+    assert chunks
+    for chunk in chunks:
+        assert text[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+        assert count_tokens(chunk["text"]) <= chunk["token_count"] <= chunk_size
+    assert chunks[0]["start_char"] == len(text) - len(text.lstrip())
+    assert chunks[-1]["end_char"] == len(text.rstrip())
+
+
+def test_chunks_make_forward_progress():
+    text = _sample_text()
+    chunks = list(iter_chunks(text, 60, 30))
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk["start_char"] >= previous["start_char"]
+        assert chunk["end_char"] > previous["end_char"]
+
+
+def test_unbroken_text_is_split_with_exact_offsets():
+    text = "word " * 20000 + "y" * 100000
+
+    chunks = list(iter_chunks(io.StringIO(text), 500, 25))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert text[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+
+
+@pytest.mark.parametrize("text, chunk_size", [
+    ("word " * 5 + "          ".join(["ab"] * 40) + ".", 20),
+    ("x" * 300 + " " * 10 + "eps \n    delta?", 11),
+    ("a." + " " * 30 + "b." + "\n" * 3 + "   c.", 4),
+])
+def test_whitespace_runs_count_toward_chunk_size(text, chunk_size):
+    chunks = list(iter_chunks(text, chunk_size, 0))
+
+    for chunk in chunks:
+        assert text[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+        assert count_tokens(chunk["text"]) <= chunk_size
+
+
+def test_chunk_size_holds_for_other_tokenizers(monkeypatch):
+    # A denser tokenizer than the four-characters-per-token estimate, as with tiktoken on long words
+    dense_count = lambda text: -(-len(text) // 2)
+    monkeypatch.setattr("workflow_agents.chunking.count_tokens", dense_count)
+    text = _sample_text()
+
+    chunks = list(iter_chunks(text, 50, 10))
+
+    for chunk in chunks:
+        assert text[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+        assert dense_count(chunk["text"]) <= 50
@@ -0,0 +1,97 @@
+"""
+Convergence Detection
+
+This module detects evaluation loops that have stopped making progress. Responses are
+fingerprinted (whitespace- and case-insensitive hash) to catch a worker cycling back
+to an earlier answer, and consecutive interactions are compared with a word-level
+similarity ratio to catch a worker that keeps returning nearly the same answer while
+the judge keeps giving nearly the same rejection.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import hashlib
+from difflib import SequenceMatcher
+
+
+class ConvergenceDetector:
+    """
+    Tracks the responses and judge evaluations of one evaluation loop and reports when
+    further interactions are unlikely to change the outcome.
+
+    Use Case: Stopping the EvaluationAgent early instead of spending all of its
+    max_interactions on a refinement that has stalled.
+    """
+
+    def __init__(self, threshold=0.98):
+        """
+        Initialize the ConvergenceDetector.
+
+        Args:
+            threshold (float): Similarity ratio (0 to 1) from which two texts count as
+                near-identical
+        """
+        self.threshold = threshold
+        self._seen_responses = set()
+        self._previous = None
+
+    def check(self, response, evaluation):
+        """
+        Record a rejected interaction and report whether the loop has stalled.
+
+        Args:
+            response (str): The worker response of this interaction
+            evaluation (str): The judge's evaluation of that response
+
+        Returns:
+            tuple or None: (reason, description) if the loop has stalled, where reason is
+            'repeated_response' or 'stalled'; None otherwise
+        """
+        fingerprint = _fingerprint(response)
+        stall = None
+        if fingerprint in self._seen_responses:
+            stall = ("repeated_response", "the worker returned a response identical to an earlier one")
+        elif self._previous is not None:
+            previous_response, previous_evaluation = self._previous
+            response_similarity = similarity(previous_response, response)
+            evaluation_similarity = similarity(previous_evaluation, evaluation)
+            if response_similarity >= self.threshold and evaluation_similarity >= self.threshold:
+                stall = ("stalled", (
+                    f"the response ({response_similarity:.0%} similar) and the judge's evaluation "
+                    f"({evaluation_similarity:.0%} similar) barely changed since the previous interaction"
+                ))
+
+        self._seen_responses.add(fingerprint)
+        self._previous = (response, evaluation)
+        return stall
+
+
+def similarity(text_one, text_two):
+    """
+    Word-level similarity ratio of two texts, from 0 (nothing shared) to 1 (identical).
+    Ratios below 0.5 are a cheap upper bound rather than the exact value.
+
+    Args:
+        text_one (str): First text
+        text_two (str): Second text
+
+    Returns:
+        float: The similarity ratio
+    """
+    words_one, words_two = text_one.lower().split(), text_two.lower().split()
+    if words_one == words_two:
+        return 1.0
+    matcher = SequenceMatcher(None, words_one, words_two, autojunk=False)
+    # quick_ratio() is a cheap upper bound; skip the full comparison for clearly different texts
+    upper_bound = matcher.quick_ratio()
+    if upper_bound < 0.5:
+        return upper_bound
+    return matcher.ratio()
+
+
+def _fingerprint(text):
+    """
+    Hash a text after normalizing case and whitespace.
+    """
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
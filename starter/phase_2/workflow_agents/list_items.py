@@ -0,0 +1,103 @@
+"""
+List Item Splitting
+
+This module splits list-shaped responses (numbered lists, user stories, feature or
+task blocks) into items so that the EvaluationAgent can judge and correct them one
+at a time. Splitting is lossless: joining the header and the items gives back the
+original text, so corrected items can be spliced into place.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import re
+
+from .validators import LINE_PREFIX, STORY_LABEL, USER_STORY_START
+
+# Item start patterns (multiline regular expressions matched at the start of each item)
+NUMBERED_ITEM = r"^[ \t]{0,3}\d+[.)][ \t]+"
+USER_STORY_ITEM = USER_STORY_START
+
+# List marker at the start of an item (bullet, number, quote or heading, then an optional
+# story label), without leading emphasis
+_LIST_MARKER = re.compile(r"[ \t]*(?:[>#]+[ \t]*)*(?:[-*+•][ \t]+|\d+[.)][ \t]*)?" + STORY_LABEL, re.IGNORECASE)
+
+
+def field_block_item(field):
+    """
+    Build an item pattern for blocks that start with a "Label:" field line, such as
+    "Feature Name:" or "Task ID:".
+
+    Args:
+        field (str): The label of the first field of each block
+
+    Returns:
+        str: The item start pattern
+    """
+    return LINE_PREFIX + re.escape(field) + r"[ \t*_]*:"
+
+
+def split_items(response, item_pattern=NUMBERED_ITEM):
+    """
+    Split a response into the text before the first item and the items themselves.
+
+    Args:
+        response (str): The response to split
+        item_pattern (str): Regular expression matching the start of every item
+
+    Returns:
+        tuple: (header, items) where items is a list of strings, each running up to the
+        start of the next item (the last one to the end of the response)
+    """
+    starts = [match.start() for match in re.finditer(item_pattern, response, re.IGNORECASE | re.MULTILINE)]
+    if not starts:
+        return response, []
+    items = [response[start:end] for start, end in zip(starts, starts[1:] + [len(response)])]
+    return response[:starts[0]], items
+
+
+def join_items(header, items):
+    """
+    Join a header and items back into one response (the inverse of split_items()).
+
+    Args:
+        header (str): Text before the first item
+        items (list): The items
+
+    Returns:
+        str: The joined response
+    """
+    return header + "".join(items)
+
+
+def replace_item(item, corrected, item_pattern=NUMBERED_ITEM):
+    """
+    Return a corrected item to splice in place of the original one. The corrected text
+    must hold exactly one item (a preamble before it is dropped). It takes over the list
+    marker (e.g. "3. ") and the separator (trailing whitespace) of the item it replaces,
+    so the joined response keeps its numbering and layout.
+
+    Args:
+        item (str): The original item
+        corrected (str): The corrected item text
+        item_pattern (str): Regular expression matching the start of every item
+
+    Returns:
+        str: The corrected item with the original list marker and trailing whitespace
+
+    Raises:
+        ValueError: If the corrected text is empty, holds several items or does not
+            start like an item
+    """
+    _, found = split_items(corrected.strip(), item_pattern)
+    if len(found) > 1:
+        raise ValueError(f"expected one corrected item, got {len(found)}")
+    text = (found[0] if found else corrected).strip()
+    if not text:
+        raise ValueError("the corrected item is empty")
+    text = _LIST_MARKER.match(item).group() + text[_LIST_MARKER.match(text).end():]
+    header, found = split_items(text, item_pattern)
+    if header or len(found) != 1:
+        raise ValueError(f"the corrected item does not start like an item: {text[:60]!r}")
+    stripped = item.rstrip()
+    return text + item[len(stripped):]
@@ -0,0 +1,314 @@
+"""
+Shared LLM Client Layer
+
+This module provides the transport layer used by every agent in the workflow_agents
+library. Instead of building a new OpenAI client (and with it a new HTTP connection
+pool and TLS handshake) for every request, agents share a single pooled client per
+process. The client keeps connections alive between calls and its pool limits can
+be tuned for high-concurrency workloads. An asynchronous twin of every request is
+available so that many agent calls can share one event loop. The endpoint can be set
+per client or for the whole process with OPENAI_BASE_URL (e.g. to point the agents at
+the local stand-in server in fake_server.py). Deterministic
+(temperature 0) chat completions can optionally be served from a ResponseCache, and
+all requests can be recorded to, or replayed from, a Cassette (see cassette.py).
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from .cassette import Cassette
+
+DEFAULT_BASE_URL = "https://openai.vocareum.com/v1"
+DEFAULT_CHAT_MODEL = "gpt-3.5-turbo"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-large"
+
+
+class LLMClient:
+    """
+    A thread-safe wrapper around a pooled OpenAI client. The underlying HTTP client
+    is created lazily on first use and reused for every subsequent chat or embedding
+    request, so connection setup is paid once per process instead of once per call.
+
+    Use Case: Shared by all agents so that concurrent workflows reuse keep-alive
+    connections rather than opening a fresh connection for each LLM call.
+    """
+
+    def __init__(self, openai_api_key, base_url=None, max_connections=100,
+                 max_keepalive_connections=20, keepalive_expiry=30.0, timeout=60.0, max_retries=2,
+                 cache=None, cassette=None):
+        """
+        Initialize the LLMClient.
+
+        Args:
+            openai_api_key (str): OpenAI API key for authentication
+            base_url (str, optional): Base URL of the OpenAI-compatible endpoint; defaults to
+                the OPENAI_BASE_URL environment variable, then DEFAULT_BASE_URL
+            max_connections (int): Maximum number of concurrent connections in the pool
+            max_keepalive_connections (int): Maximum number of idle connections kept alive
+            keepalive_expiry (float): Seconds an idle connection is kept before closing
+            timeout (float): Request timeout in seconds
+            max_retries (int): Number of automatic retries on transient errors
+            cache (ResponseCache, optional): Cache for temperature-0 chat completions
+            cassette (Cassette, optional): Records every request sent to the endpoint or, in
+                replay mode, answers every request without contacting it
+        """
+        self.openai_api_key = openai_api_key
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.cassette = cassette
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        Return the pooled OpenAI client, creating it on first access.
+
+        Returns:
+            OpenAI: Client bound to a keep-alive httpx connection pool
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+                    self._client = OpenAI(
+                        base_url=self.base_url,
+                        api_key=self.openai_api_key,
+                        http_client=http_client,
+                        max_retries=self.max_retries
+                    )
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        Return the pooled AsyncOpenAI client for the running event loop, creating it on
+        first access. Async connection pools are bound to the loop that opened them, so
+        one pool is kept per loop.
+
+        Returns:
+            AsyncOpenAI: Client bound to a keep-alive httpx.AsyncClient connection pool
+        """
+        loop = asyncio.get_running_loop()
+        async_client = self._async_clients.get(loop)
+        if async_client is None:
+            http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.openai_api_key,
+                http_client=http_client,
+                max_retries=self.max_retries
+            )
+            self._async_clients[loop] = async_client
+        return async_client
+
+    def chat(self, messages, model=DEFAULT_CHAT_MODEL, temperature=0):
+        """
+        Send a chat completion request and return the message content.
+
+        Args:
+            messages (list): Chat messages in OpenAI format
+            model (str): Chat model to use
+            temperature (float): Sampling temperature
+
+        Returns:
+            str: The content of the first completion choice
+        """
+        cache_key = self._chat_cache_key(messages, model, temperature)
+        if cache_key is not None:
+            content = self.cache.get(cache_key)
+            if content is not None:
+                return content
+
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if self.cassette is not None and self.cassette.replaying:
+            content, delay = self.cassette.replay("chat", request)
+            if delay:
+                time.sleep(delay)
+        else:
+            started = time.perf_counter()
+            response = self.client.chat.completions.create(**request)
+            content = response.choices[0].message.content
+            if self.cassette is not None:
+                self.cassette.record("chat", request, content, time.perf_counter() - started)
+        if cache_key is not None and content is not None:
+            self.cache.set(cache_key, content)
+        return content
+
+    async def achat(self, messages, model=DEFAULT_CHAT_MODEL, temperature=0):
+        """
+        Asynchronous counterpart of chat().
+
+        Args:
+            messages (list): Chat messages in OpenAI format
+            model (str): Chat model to use
+            temperature (float): Sampling temperature
+
+        Returns:
+            str: The content of the first completion choice
+        """
+        cache_key = self._chat_cache_key(messages, model, temperature)
+        if cache_key is not None:
+            content = self.cache.get(cache_key)
+            if content is not None:
+                return content
+
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if self.cassette is not None and self.cassette.replaying:
+            content, delay = self.cassette.replay("chat", request)
+            if delay:
+                await asyncio.sleep(delay)
+        else:
+            started = time.perf_counter()
+            response = await self.async_client.chat.completions.create(**request)
+            content = response.choices[0].message.content
+            if self.cassette is not None:
+                self.cassette.record("chat", request, content, time.perf_counter() - started)
+        if cache_key is not None and content is not None:
+            self.cache.set(cache_key, content)
+        return content
+
+    def _chat_cache_key(self, messages, model, temperature):
+        """
+        Return the cache key for a chat request, or None if it must not be cached.
+        Only temperature-0 completions are deterministic enough to reuse. The endpoint is
+        part of the key, so replies of one endpoint (e.g. the local fake server) are never
+        served to a client of another.
+        """
+        if self.cache is None or temperature != 0:
+            return None
+        return self.cache.make_key("chat", self.base_url, model, messages)
+
+    def embed(self, texts, model=DEFAULT_EMBEDDING_MODEL):
+        """
+        Fetch embeddings for one text or a batch of texts in a single request.
+
+        Args:
+            texts (str or list): A single text or a list of texts to embed
+            model (str): Embedding model to use
+
+        Returns:
+            list: One embedding vector for a single text, or a list of vectors
+            (in input order) for a list of texts
+        """
+        request = {"model": model, "input": texts}
+        if self.cassette is not None and self.cassette.replaying:
+            vectors, delay = self.cassette.replay("embed", request)
+            if delay:
+                time.sleep(delay)
+            return vectors
+
+        started = time.perf_counter()
+        response = self.client.embeddings.create(**request, encoding_format="float")
+        vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        vectors = vectors[0] if isinstance(texts, str) else vectors
+        if self.cassette is not None:
+            self.cassette.record("embed", request, vectors, time.perf_counter() - started)
+        return vectors
+
+    async def aembed(self, texts, model=DEFAULT_EMBEDDING_MODEL):
+        """
+        Asynchronous counterpart of embed().
+
+        Args:
+            texts (str or list): A single text or a list of texts to embed
+            model (str): Embedding model to use
+
+        Returns:
+            list: One embedding vector for a single text, or a list of vectors
+            (in input order) for a list of texts
+        """
+        request = {"model": model, "input": texts}
+        if self.cassette is not None and self.cassette.replaying:
+            vectors, delay = self.cassette.replay("embed", request)
+            if delay:
+                await asyncio.sleep(delay)
+            return vectors
+
+        started = time.perf_counter()
+        response = await self.async_client.embeddings.create(**request, encoding_format="float")
+        vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        vectors = vectors[0] if isinstance(texts, str) else vectors
+        if self.cassette is not None:
+            self.cassette.record("embed", request, vectors, time.perf_counter() - started)
+        return vectors
+
+    def close(self):
+        """
+        Close the synchronous connection pool. A new pool is created on next use.
+        """
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """
+        Close the asynchronous connection pool of the running event loop.
+        """
+        async_client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if async_client is not None:
+            await async_client.close()
+
+
+_shared_clients = {}  # (API key, base URL) -> client; base URL None marks the installed default
+_shared_clients_lock = threading.Lock()
+_env_cassette = None
+
+
+def get_shared_client(openai_api_key, base_url=None):
+    """
+    Return the process-wide LLMClient for the given API key and endpoint, creating it
+    if needed. Clients created here record or replay through the cassette configured by
+    the LLM_CASSETTE environment variables, if any (see Cassette.from_env()).
+
+    Args:
+        openai_api_key (str): OpenAI API key for authentication
+        base_url (str, optional): Base URL of the endpoint. Without it, the client
+            installed by set_shared_client() for this key is returned if there is one;
+            otherwise the URL resolves as in LLMClient (OPENAI_BASE_URL, then DEFAULT_BASE_URL)
+
+    Returns:
+        LLMClient: The shared client for this API key and endpoint
+    """
+    global _env_cassette
+    with _shared_clients_lock:
+        if base_url is None and (openai_api_key, None) in _shared_clients:
+            return _shared_clients[(openai_api_key, None)]
+        key = (openai_api_key, base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL)
+        if key not in _shared_clients:
+            if _env_cassette is None:
+                _env_cassette = Cassette.from_env()
+            _shared_clients[key] = LLMClient(openai_api_key, base_url=key[1], cassette=_env_cassette)
+        return _shared_clients[key]
+
+
+def set_shared_client(client):
+    """
+    Install a preconfigured LLMClient as the shared client for its API key and endpoint,
+    and as the default for its API key, so agents created afterwards pick it up (e.g.
+    with custom pool limits or another endpoint).
+
+    Args:
+        client (LLMClient): The client to share
+    """
+    with _shared_clients_lock:
+        _shared_clients[(client.openai_api_key, client.base_url)] = client
+        _shared_clients[(client.openai_api_key, None)] = client
@@ -0,0 +1,161 @@
+"""
+Structured Action Plans
+
+This module parses and validates the structured plans produced by the
+ActionPlanningAgent. A plan is a list of step dictionaries with an 'id', the step
+'text', a suggested 'route' and the ids of the earlier steps it 'depends_on'. Plans
+are cleaned before use: headings and commentary are dropped, duplicate steps are
+merged, unknown routes are cleared and dependencies are restricted to earlier steps,
+so every plan is a valid dependency graph (a DAG) in execution order.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import re
+
+from .verdicts import extract_json_object
+
+PLAN_TEMPLATE = (
+    '{"steps": [{"id": "1", "text": "<the step>", "route": "<the best suited route>", '
+    '"depends_on": ["<ids of earlier steps whose results this step needs>"]}, ...]}'
+)
+
+_LIST_MARKER = re.compile(r"^(?:[#>*_\-•\s]|\d+[.)]\s|step\s+\d+\s*[:.)-])*", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def build_plan_instructions(routes=None):
+    """
+    Build the instructions asking the planner for a structured JSON plan.
+
+    Args:
+        routes (list, optional): Route dictionaries ('name', 'description') or route names
+
+    Returns:
+        str: Instructions to append to the planner's system prompt
+    """
+    instructions = (
+        f"Return the steps as a JSON object of this form: {PLAN_TEMPLATE} "
+        f"Each step must be one concrete action. Only list a dependency when the step needs the result "
+        f"of that earlier step; steps that do not need each other must not depend on each other."
+    )
+    if routes:
+        choices = "; ".join(
+            f"{route['name']}: {route.get('description', '')}" if isinstance(route, dict) else str(route)
+            for route in routes
+        )
+        instructions += f" Choose each step's route from these: {choices}"
+    return instructions
+
+
+def parse_plan(text, route_names=None):
+    """
+    Parse a planner reply into a validated plan. Replies without a JSON plan are read
+    one step per line; such steps carry no dependency information, so each one is
+    made to depend on the previous step (the original sequential order).
+
+    Args:
+        text (str): The raw planner reply
+        route_names (list, optional): Valid route names for the 'route' suggestions
+
+    Returns:
+        list: Validated step dictionaries (see validate_plan())
+    """
+    data = extract_json_object(text or "")
+    if data is not None and isinstance(data.get("steps"), list):
+        return validate_plan(data["steps"], route_names)
+
+    steps = []
+    for line in (text or "").splitlines():
+        if _is_step_line(line):
+            previous = [str(len(steps))] if steps else []
+            steps.append({"id": str(len(steps) + 1), "text": line, "depends_on": previous})
+    return validate_plan(steps, route_names)
+
+
+def validate_plan(steps, route_names=None):
+    """
+    Clean a raw plan: drop empty steps, merge duplicate steps (dependencies on a
+    dropped duplicate point to the step it duplicates), make ids unique, keep only
+    known routes, and keep only dependencies on earlier steps so the plan is acyclic.
+
+    Args:
+        steps (list): Raw steps, as dictionaries or plain strings
+        route_names (list, optional): Valid route names; None accepts any route
+
+    Returns:
+        list: Step dictionaries with 'id' (str), 'text' (str), 'route' (str or None)
+        and 'depends_on' (list of ids of earlier steps)
+    """
+    plan, id_map, by_text = [], {}, {}
+    for number, raw in enumerate(steps, start=1):
+        if isinstance(raw, str):
+            raw = {"text": raw}
+        if not isinstance(raw, dict):
+            continue
+        text = _clean_step_text(str(raw.get("text") or raw.get("step") or raw.get("description") or ""))
+        raw_id = str(raw.get("id", number)).strip() or str(number)
+        if not text:
+            continue
+
+        key = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+        if key in by_text:
+            id_map.setdefault(raw_id, by_text[key])
+            continue
+        step_id = raw_id if raw_id not in by_text.values() else f"{raw_id}-{number}"
+        id_map.setdefault(raw_id, step_id)
+        by_text[key] = step_id
+
+        depends_on = raw.get("depends_on", raw.get("dependencies")) or []
+        if not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        plan.append({
+            "id": step_id,
+            "text": text,
+            "route": _match_route(raw.get("route"), route_names),
+            "depends_on": [str(dependency).strip() for dependency in depends_on]
+        })
+
+    position = {step["id"]: index for index, step in enumerate(plan)}
+    for index, step in enumerate(plan):
+        dependencies = []
+        for dependency in step["depends_on"]:
+            target = id_map.get(dependency)
+            if target is not None and position[target] < index and target not in dependencies:
+                dependencies.append(target)
+        step["depends_on"] = dependencies
+    return plan
+
+
+def _clean_step_text(text):
+    """
+    Strip list markup and surrounding whitespace from a step.
+    """
+    return _LIST_MARKER.sub("", text.strip()).strip(" *_")
+
+
+def _is_step_line(line):
+    """
+    Return True if a line of a plain-text plan looks like a step rather than a blank
+    line, a heading or commentary introducing a list.
+    """
+    stripped = line.strip()
+    if not stripped or stripped.startswith("#") or stripped.endswith(":"):
+        return False
+    return len(_clean_step_text(stripped).split()) >= 2
+
+
+def _match_route(route, route_names):
+    """
+    Return the canonical name of a suggested route, or None if it is not a known route.
+    """
+    if not route or not isinstance(route, str):
+        return None
+    if route_names is None:
+        return route.strip()
+    for name in route_names:
+        if name.lower() == route.strip().lower():
+            return name
+    return None
@@ -0,0 +1,195 @@
+"""
+Response Cache
+
+This module provides a content-addressed cache for deterministic LLM results. Every
+chat call in the workflow_agents library runs at temperature 0 against a fixed model,
+so an identical request always yields the same answer and does not need a second
+round trip. Entries live in an in-memory LRU tier and, optionally, in an on-disk
+SQLite tier that survives between runs.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    A two-tier (memory LRU + optional SQLite) cache with size- and TTL-based eviction
+    and hit/miss counters. Keys are SHA-256 digests of the request content and values
+    may be any JSON-serializable object.
+
+    Use Case: Avoid paying again for identical temperature-0 completions when a
+    workflow is re-run on the same inputs.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, path=None, max_disk_entries=100000):
+        """
+        Initialize the ResponseCache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            ttl (float, optional): Seconds after which an entry expires; None keeps entries forever
+            path (str, optional): SQLite file for the persistent tier; None disables it
+            max_disk_entries (int): Maximum number of entries kept in the SQLite tier
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._disk_entries = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Build a content-addressed key from JSON-serializable request parts.
+
+        Args:
+            *parts: The request content, e.g. ("chat", model, messages)
+
+        Returns:
+            str: Hex SHA-256 digest of the canonical JSON encoding of the parts
+        """
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a key in memory, then on disk.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at is None or expires_at > now:
+                        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, value, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_entries -= 1
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Store a value in memory and, if enabled, on disk.
+
+        Args:
+            key (str): Cache key from make_key()
+            value: JSON-serializable value to cache
+        """
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                exists = self._db.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+                )
+                if exists is None:
+                    self._disk_entries += 1
+                if self._disk_entries > self.max_disk_entries:
+                    self._db.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                    overflow = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_disk_entries
+                    if overflow > 0:
+                        self._db.execute(
+                            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                            (overflow,)
+                        )
+                        self.evictions += overflow
+                    self._disk_entries = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                self._db.commit()
+
+    def _remember(self, key, value, expires_at):
+        """
+        Insert into the memory tier, evicting the least recently used entries.
+        """
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Hit/miss counters, hit rate, evictions and entry counts per tier
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries if self._db is not None else 0
+            }
+
+    def clear(self):
+        """
+        Remove every entry from both tiers and reset the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+                self._disk_entries = 0
+            self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+    def close(self):
+        """
+        Close the SQLite tier, if any.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
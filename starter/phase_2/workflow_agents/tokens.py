@@ -0,0 +1,50 @@
+"""
+Token Counting Utilities
+
+Helpers for sizing text in model tokens. When the optional `tiktoken` package is
+installed its cl100k_base encoding (used by gpt-3.5-turbo and text-embedding-3-*)
+gives exact counts; otherwise a conservative estimate of one token per four
+characters is used.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import math
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character-based estimate
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+
+def _get_encoding():
+    """
+    Return the cached tiktoken encoding, or None if tiktoken is unavailable.
+    """
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Count (or estimate) the number of model tokens in a text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Number of tokens
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,232 @@
+"""
+Local Response Validators
+
+This module provides rule-based checks that the EvaluationAgent runs before calling
+its LLM judge. A validator is any callable that takes a response and returns a list
+of problems (an empty list means the response is structurally valid). When a check
+fails, the response is rejected without an API call and the problems are turned
+into correction instructions for the worker; only structurally valid responses
+reach the judge.
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import re
+
+# Optional list markup before a line's content: bullets, numbering, headings, bold, quotes.
+# Public so that item patterns (see list_items.py) recognize the same line starts.
+LINE_PREFIX = r"^[ \t>#*_\-•]*(?:\d+[.)][ \t]*)?[ \t*_]*"
+
+# Optional user story label, as in "User Story 1: As a ..."
+STORY_LABEL = r"(?:(?:User[ \t]+)?Story[ \t]*#?\d+[ \t*_]*[:.)\-][ \t*_]*)?"
+
+# Start of a user story line
+USER_STORY_START = LINE_PREFIX + STORY_LABEL + r"As an?(?![a-z0-9])"
+
+
+class RegexValidator:
+    """
+    Requires a regular expression to match the response a minimum number of times.
+
+    Use Case: Simple structural requirements such as "must contain a Task ID line".
+    """
+
+    def __init__(self, pattern, description, min_matches=1, flags=re.IGNORECASE | re.MULTILINE):
+        """
+        Initialize the RegexValidator.
+
+        Args:
+            pattern (str): Regular expression searched for in the response
+            description (str): What the pattern requires, used in problems and fix instructions
+            min_matches (int): Minimum number of non-overlapping matches
+            flags (int): Flags for re.compile
+        """
+        self.pattern = re.compile(pattern, flags)
+        self.description = description
+        self.min_matches = min_matches
+
+    def __call__(self, response):
+        """
+        Check a response.
+
+        Args:
+            response (str): The worker response
+
+        Returns:
+            list: Problems found; empty if the response is valid
+        """
+        count = len(self.pattern.findall(response))
+        if count < self.min_matches:
+            return [f"Expected at least {self.min_matches} match(es) of: {self.description} (found {count})"]
+        return []
+
+
+class UserStoryValidator:
+    """
+    Checks that a response contains user stories and that every one of them follows
+    "As a [type of user], I want [an action or feature] so that [benefit/value]".
+
+    Use Case: Pre-validating product manager output before it is scored by the judge.
+    """
+
+    description = "Each user story must follow: As a [type of user], I want [an action or feature] so that [benefit/value]."
+
+    _STORY_START = re.compile(USER_STORY_START, re.IGNORECASE | re.MULTILINE)
+    # Each keyword may be wrapped in Markdown emphasis, e.g. "**As a** user, **I want** ..."
+    _STORY = re.compile(
+        r"As\s+an?[*_]*\s+\S.*?,?[*_]*\s+[*_]*I\s+want[*_]*\s+\S.*?,?[*_]*\s+[*_]*so\s+that[*_]*\s+\S",
+        re.IGNORECASE | re.DOTALL
+    )
+
+    def __init__(self, min_stories=1):
+        """
+        Initialize the UserStoryValidator.
+
+        Args:
+            min_stories (int): Minimum number of stories
+        """
+        self.min_stories = min_stories
+
+    def __call__(self, response):
+        """
+        Check a response.
+
+        Args:
+            response (str): The worker response
+
+        Returns:
+            list: Problems found; empty if the response is valid
+        """
+        problems = []
+        stories = _split_blocks(response, self._STORY_START)
+        for number, story in enumerate(stories, start=1):
+            if not self._STORY.search(story):
+                problems.append(f"User story {number} does not follow the required structure: {_preview(story)}")
+        if len(stories) < self.min_stories:
+            problems.append(f"Expected at least {self.min_stories} user stories starting with 'As a', found {len(stories)}")
+        return problems
+
+
+class FieldBlockValidator:
+    """
+    Checks that a response is a sequence of blocks (e.g. features or tasks) in which
+    every block contains each of the required "Label:" fields with a value.
+
+    Use Case: Pre-validating program manager features (Feature Name, Description, ...)
+    and development engineer tasks (Task ID, Task Title, ...).
+    """
+
+    def __init__(self, fields, min_blocks=1, block_name=None):
+        """
+        Initialize the FieldBlockValidator.
+
+        Args:
+            fields (list): Required field labels; the first one starts each block
+            min_blocks (int): Minimum number of blocks
+            block_name (str, optional): Name of a block in problems; defaults to the first field
+        """
+        self.fields = list(fields)
+        self.min_blocks = min_blocks
+        self.block_name = block_name or self.fields[0]
+        self.description = "Each entry must contain these fields, one per line: " + ", ".join(
+            f"{field}:" for field in self.fields
+        )
+        self._labels = {field: _field_pattern(field) for field in self.fields}
+
+    def __call__(self, response):
+        """
+        Check a response.
+
+        Args:
+            response (str): The worker response
+
+        Returns:
+            list: Problems found; empty if the response is valid
+        """
+        problems = []
+        blocks = _split_blocks(response, self._labels[self.fields[0]])
+        for number, block in enumerate(blocks, start=1):
+            missing = [field for field in self.fields if not self._has_value(block, field)]
+            if missing:
+                problems.append(f"{self.block_name} {number} is missing: {', '.join(missing)} ({_preview(block)})")
+        if len(blocks) < self.min_blocks:
+            problems.append(f"Expected at least {self.min_blocks} entries starting with '{self.fields[0]}:', found {len(blocks)}")
+        return problems
+
+    def _has_value(self, block, field):
+        """
+        Return True if the field label appears in the block with a value on the same line
+        or on the next non-empty line (as long as that line is not another field).
+        """
+        match = self._labels[field].search(block)
+        if match is None:
+            return False
+        first_line, _, remainder = block[match.end():].partition("\n")
+        if first_line.strip(" \t*_"):
+            return True
+        next_line = next((line for line in remainder.splitlines() if line.strip()), "")
+        return bool(next_line) and not any(label.match(next_line) for label in self._labels.values())
+
+
+def run_validators(validators, response):
+    """
+    Run validators over a response and collect their problems.
+
+    Args:
+        validators (list): Callables taking a response and returning a list of problems
+        response (str): The worker response
+
+    Returns:
+        list: (validator, problems) pairs for every validator that failed
+    """
+    failures = []
+    for validator in validators:
+        problems = list(validator(response) or [])
+        if problems:
+            failures.append((validator, problems))
+    return failures
+
+
+def build_fix_instructions(failures):
+    """
+    Turn validator failures into correction instructions for the worker.
+
+    Args:
+        failures (list): (validator, problems) pairs from run_validators()
+
+    Returns:
+        str: Instructions listing each problem and the expected format
+    """
+    lines = ["Fix these structural problems:"]
+    lines.extend(f"- {problem}" for _, problems in failures for problem in problems)
+    descriptions = [getattr(validator, "description", None) for validator, _ in failures]
+    descriptions = [description for description in descriptions if description]
+    if descriptions:
+        lines.append("Required format:")
+        lines.extend(f"- {description}" for description in descriptions)
+    return "\n".join(lines)
+
+
+def _field_pattern(field):
+    """
+    Compile a pattern for a "Label:" field at the start of a line, allowing list markup
+    and bold/italic markers around the label.
+    """
+    return re.compile(LINE_PREFIX + re.escape(field) + r"[ \t*_]*:", re.IGNORECASE | re.MULTILINE)
+
+
+def _split_blocks(response, start_pattern):
+    """
+    Split a response into blocks, each starting at a match of start_pattern.
+    """
+    starts = [match.start() for match in start_pattern.finditer(response)]
+    return [response[start:end] for start, end in zip(starts, starts[1:] + [len(response)])]
+
+
+def _preview(text, length=60):
+    """
+    Return the first line of a text, shortened for problem messages.
+    """
+    line = text.strip().splitlines()[0] if text.strip() else ""
+    return line if len(line) <= length else line[:length - 3] + "..."
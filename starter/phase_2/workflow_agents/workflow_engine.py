@@ -0,0 +1,216 @@
+"""
+Workflow Engine
+
+This module executes dependency-annotated plans (see plans.py) as a DAG. A step
+becomes ready once every step it depends on has completed, and ready steps run
+concurrently under a global concurrency limit, so the wall time of a plan
+approaches the length of its critical path instead of the sum of its steps.
+Results are collected in plan order. A failed step does not stop independent
+branches; only the steps that depend on it (directly or not) are skipped. Steps
+completed by an earlier, interrupted run can be passed in to resume a plan, and a
+callback receives every step record as soon as the step finishes (for checkpointing,
+see run_journal.py).
+
+Author: Agentic AI Project
+Date: January 2025
+"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class WorkflowEngine:
+    """
+    Runs the steps of a plan concurrently while respecting their dependencies.
+
+    Use Case: Executing an ActionPlanningAgent plan in which, for example, the
+    development tasks of one user story do not wait for those of another.
+    """
+
+    def __init__(self, max_concurrency=4):
+        """
+        Initialize the WorkflowEngine.
+
+        Args:
+            max_concurrency (int): Maximum number of steps executing at once
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        self.max_concurrency = max_concurrency
+
+    def run(self, plan, execute, completed=None, on_finish=None):
+        """
+        Execute a plan, running ready steps in a thread pool.
+
+        Args:
+            plan (list): Step dictionaries with 'id', 'text' and 'depends_on'
+            execute (callable): Called as execute(step, dependency_results) for every step,
+                where dependency_results maps each dependency id to its result; returns
+                the step result
+            completed (dict, optional): {step id: result} of steps already completed by an
+                earlier run; these are not executed again
+            on_finish (callable, optional): Called with the record of every executed step
+                as soon as it finishes (from the calling thread)
+
+        Returns:
+            list: One record per step, in plan order, with 'id', 'text', 'status'
+            ('completed', 'failed' or 'skipped'), 'result', 'error', 'duration' (seconds)
+            and 'resumed' (True for steps taken from `completed`)
+        """
+        state = _PlanState(plan, completed)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            running = {}
+            ready = state.initially_ready()
+            while ready or running:
+                for step_id in ready:
+                    running[executor.submit(self._timed, execute, state, step_id)] = step_id
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                ready = []
+                for future in done:
+                    step_id = running.pop(future)
+                    result, error, duration = future.result()
+                    ready += state.finish(step_id, result, error, duration)
+                    if on_finish:
+                        on_finish(state.records[step_id])
+        return state.records_in_order()
+
+    async def arun(self, plan, execute, completed=None, on_finish=None):
+        """
+        Asynchronous counterpart of run(). `execute` may be a coroutine function;
+        plain functions are run in threads so they do not block the event loop.
+
+        Args:
+            plan (list): Step dictionaries with 'id', 'text' and 'depends_on'
+            execute (callable): Called as execute(step, dependency_results) for every step
+            completed (dict, optional): {step id: result} of steps already completed
+            on_finish (callable, optional): Called with the record of every executed step
+
+        Returns:
+            list: One record per step, in plan order (see run())
+        """
+        state = _PlanState(plan, completed)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_step(step_id):
+            async with semaphore:
+                step = state.steps[step_id]
+                started = time.perf_counter()
+                try:
+                    if inspect.iscoroutinefunction(execute):
+                        result = await execute(step, state.dependency_results(step_id))
+                    else:
+                        result = await asyncio.to_thread(execute, step, state.dependency_results(step_id))
+                    error = None
+                except Exception as exception:
+                    result, error = None, exception
+            return step_id, result, error, time.perf_counter() - started
+
+        running = {asyncio.create_task(run_step(step_id)) for step_id in state.initially_ready()}
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step_id, result, error, duration = task.result()
+                for ready_id in state.finish(step_id, result, error, duration):
+                    running.add(asyncio.create_task(run_step(ready_id)))
+                if on_finish:
+                    on_finish(state.records[step_id])
+        return state.records_in_order()
+
+    @staticmethod
+    def _timed(execute, state, step_id):
+        """
+        Execute one step in a worker thread, capturing its result or exception and its duration.
+        """
+        started = time.perf_counter()
+        try:
+            result = execute(state.steps[step_id], state.dependency_results(step_id))
+            error = None
+        except Exception as exception:
+            result, error = None, exception
+        return result, error, time.perf_counter() - started
+
+
+class _PlanState:
+    """
+    Dependency bookkeeping for one plan execution: which steps are waiting on which,
+    and the record of every step.
+    """
+
+    def __init__(self, plan, completed=None):
+        self.steps = {step["id"]: step for step in plan}
+        self.order = [step["id"] for step in plan]
+        if len(self.steps) != len(self.order):
+            raise ValueError("Plan step ids must be unique")
+        self.records = {
+            step_id: {"id": step_id, "text": step.get("text"), "status": "pending",
+                      "result": None, "error": None, "duration": None, "resumed": False}
+            for step_id, step in self.steps.items()
+        }
+        for step_id, result in (completed or {}).items():
+            if step_id in self.records:
+                self.records[step_id].update(status="completed", result=result, resumed=True)
+        # Dependencies on ids outside the plan, or already completed, are not waited on
+        self.waiting = {
+            step_id: {dependency for dependency in step.get("depends_on", [])
+                      if dependency in self.steps and self.records[dependency]["status"] == "pending"}
+            for step_id, step in self.steps.items()
+        }
+        self.dependents = {step_id: [] for step_id in self.order}
+        for step_id in self.order:
+            for dependency in self.waiting[step_id]:
+                self.dependents[dependency].append(step_id)
+
+    def initially_ready(self):
+        """
+        Return the ids of the pending steps without pending dependencies, in plan order.
+        """
+        return [step_id for step_id in self.order
+                if self.records[step_id]["status"] == "pending" and not self.waiting[step_id]]
+
+    def dependency_results(self, step_id):
+        """
+        Return {dependency id: result} for the dependencies of a step.
+        """
+        return {dependency: self.records[dependency]["result"] for dependency in self.steps[step_id].get("depends_on", [])
+                if dependency in self.records}
+
+    def finish(self, step_id, result, error, duration):
+        """
+        Record a finished step and return the ids of the steps it made ready. Steps
+        depending on a failed step are marked skipped, transitively.
+        """
+        record = self.records[step_id]
+        record.update(result=result, error=str(error) if error else None, duration=duration,
+                      status="failed" if error else "completed")
+        ready = []
+        for dependent in self.dependents[step_id]:
+            if self.records[dependent]["status"] != "pending":
+                continue
+            if error:
+                self._skip(dependent, f"dependency {step_id} failed")
+                continue
+            self.waiting[dependent].discard(step_id)
+            if not self.waiting[dependent]:
+                ready.append(dependent)
+        return sorted(ready, key=self.order.index)
+
+    def _skip(self, step_id, reason):
+        """
+        Mark a step and everything depending on it as skipped.
+        """
+        self.records[step_id].update(status="skipped", error=reason)
+        for dependent in self.dependents[step_id]:
+            if self.records[dependent]["status"] == "pending":
+                self._skip(dependent, f"dependency {step_id} was skipped")
+
+    def records_in_order(self):
+        """
+        Return the step records in plan order. Steps still pending (a dependency cycle)
+        are reported as skipped.
+        """
+        for record in self.records.values():
+            if record["status"] == "pending":
+                record.update(status="skipped", error="unresolved dependencies")
+        return [self.records[step_id] for step_id in self.order]